@@ -14,9 +14,15 @@ h.setFormatter(f)
 lg.setLevel(logging.DEBUG)
 lg.addHandler(h)
 
-import uuid
 import pdb
 import copy
+import contextlib
+import pitch
+import idgen
+try:
+    import instrumentation      # python 3 only, stats and profiling are off without it
+except ImportError:
+    instrumentation = None
 
 # [staff_number, c.offset_x, c.offset_y, note, line_number, 
 #   glyph_kind, actual_glyph, glyph_char, uod, c.ncols, c.nrows]
@@ -54,10 +60,16 @@ class AomrMeiOutput(object):
         'resupinus': ['u'], # torculus.resupinus
     }
     
-    SCALE = ['a','b','c','d','e','f','g']
-    
-    def __init__(self, incoming_data, original_image, page_number=None):
+    def __init__(self, incoming_data, original_image, page_number=None, ids='random', stats=False, profile=None, profile_path=None):
         self._recognition_results = incoming_data
+        self._ids = idgen.get_ids(ids)
+        if instrumentation is None:
+            if stats or profile:
+                raise ValueError('stats and profiling need python 3')
+            self.stats = None
+        else:
+            self.stats = instrumentation.get_stats(stats)
+            instrumentation.check_profiler(profile)
         self.mei = mod.mei_()
         self.staff = None
         self.staff_num = 1
@@ -133,20 +145,21 @@ class AomrMeiOutput(object):
         self.staffel.add_child(self.layer)
         self.section.add_child(self.staffel)
         
-        for sysnum,syst in self._recognition_results.iteritems():            
-            self.system = syst
-            self.systembreak = self._parse_system(sysnum, syst)
-            z = mod.zone_()
-            z.id = self._idgen()
-            z.attributes = {'ulx': self.system['coord'][0], 'uly': self.system['coord'][1], \
-                                'lrx': self.system['coord'][2], 'lry': self.system['coord'][3]}
-            
-            self.surface.add_child(z)
-            # self.system.facs = z.id
-            s = self._create_system_element()
-            s.facs = z.id
-            self.pg.add_child(s)
-            self.systembreak.attributes = {"systemref": s.id}
+        with self._instrumented(profile, profile_path):
+            for sysnum,syst in self._recognition_results.iteritems():            
+                self.system = syst
+                self.systembreak = self._parse_system(sysnum, syst)
+                z = mod.zone_()
+                z.id = self._idgen()
+                z.attributes = {'ulx': self.system['coord'][0], 'uly': self.system['coord'][1], \
+                                    'lrx': self.system['coord'][2], 'lry': self.system['coord'][3]}
+                
+                self.surface.add_child(z)
+                # self.system.facs = z.id
+                s = self._create_system_element()
+                s.facs = z.id
+                self.pg.add_child(s)
+                self.systembreak.attributes = {"systemref": s.id}
         
         self.mei.add_child(self.music)
         
@@ -165,18 +178,26 @@ class AomrMeiOutput(object):
         # staffel = self._create_staff_element()
         # staffel.attributes = {'n': stfnum}
         
+        if self.stats is not None:
+            self.stats.count('glyphs', len(self.system['content']))
         for c in self.system['content']:
             # parse the glyphs per staff.
             self.glyph = c
             if c['type'] == 'neume':
                 if not self.glyph['form']:
                     lg.debug("Skipping glyph: {0}".format(self.glyph))
+                    if self.stats is not None:
+                        self.stats.count('skipped')
                     continue
                 if self.glyph['form'][0] not in self.NEUME_NOTES.keys():
+                    if self.stats is not None:
+                        self.stats.count('skipped')
                     continue
                 else:
                     try:
                         self.layer.add_child(self._create_neume_element())
+                        if self.stats is not None:
+                            self.stats.count('groups')
                     except Exception:
                         lg.debug("Cannot add neume element {0}. Skipping.".format(self.glyph))
                         
@@ -216,6 +237,25 @@ class AomrMeiOutput(object):
         return sysbrk
         
         
+    def get_stats(self):
+        # timings in seconds and counters, or None without stats
+        if self.stats is None:
+            return None
+        return self.stats.as_dict()
+        
+    @contextlib.contextmanager
+    def _instrumented(self, profile, profile_path):
+        # the build stage, under the profiler
+        if instrumentation is None:
+            yield
+            return
+        with instrumentation.profiled(profile, profile_path):
+            if self.stats is None:
+                yield
+            else:
+                with self.stats.stage('build'):
+                    yield
+        
     def _create_graphic_element(self, imgfile):
         graphic = mod.graphic_()
         graphic.id = self._idgen()
@@ -248,6 +288,8 @@ class AomrMeiOutput(object):
     def _create_zone_element(self):
         zone = mod.zone_()
         zone.id = self._idgen()
+        if self.stats is not None:
+            self.stats.count('zones')
         zone.attributes = {'ulx': self.glyph['coord'][0], 'uly': self.glyph['coord'][1], \
                             'lrx': self.glyph['coord'][2], 'lry': self.glyph['coord'][3]}
         self.surface.add_child(zone)
@@ -377,9 +419,7 @@ class AomrMeiOutput(object):
         if num_notes > 1:
             # we need to figure out the rest of the pitches in the neume.
             ivals = [int(d) for d in self._note_elements if d.isdigit()]
-            try:
-                idx = self.SCALE.index(self.glyph['strt_pitch'])
-            except ValueError:
+            if self.glyph['strt_pitch'] not in pitch.STEPS:
                 raise AomrMeiPitchNotFoundError("The pitch {0} was not found in the scale".format(self.glyph['strt_pitch']))
                 
             if len(ivals) != (num_notes - 1):
@@ -393,39 +433,15 @@ class AomrMeiOutput(object):
             # note elements = torculus.2.2.he.ve
             # ivals = [2,2]
             # torculus = ['u','d']
-            this_pos = copy.deepcopy(self.glyph['strt_pos'])
-            for n in xrange(len(ivals)):
-                # get the direction
-                dir = this_neume_form[n]
-                iv = ivals[n]
-                n_idx = idx
-                if dir == "u":
-                    n_idx = ((idx + iv) % len(self.SCALE)) - 1
-                    this_pos -= (iv - 1)
-                elif dir == "d":
-                    n_idx = idx - (iv -1)
-                    this_pos += (iv - 1)
-                    if n_idx < 0:
-                        n_idx += len(self.SCALE)
-                idx = n_idx
-                self._neume_pitches.append(self.SCALE[n_idx])
+            # only the note names are taken from the pitches, octaves follow
+            # the staff position, which goes down as the pitch goes up
+            start = pitch.to_diatonic(self.glyph['strt_pitch'], 0)
+            for value in pitch.transpose(start, this_neume_form, ivals)[1:]:
+                self._neume_pitches.append(pitch.from_diatonic(value)[0])
 
-                actual_line = 10 - (2*(clef_pos-1))
-
-                if clef_type == "c":
-                    if this_pos <= actual_line:
-                        note_octaves.append(4)
-                    elif this_pos > actual_line + 7:
-                        note_octaves.append(2)
-                    else:
-                        note_octaves.append(3)
-                elif clef_type == "f":
-                    if (actual_line + 3) >= this_pos > (actual_line - 3):
-                        note_octaves.append(3)
-                    elif this_pos < (actual_line - 3):
-                        note_octaves.append(4)
-                    elif this_pos > (actual_line + 3):
-                        note_octaves.append(2)
+                octave = pitch.staff_octave(clef_type, clef_pos, self.glyph['strt_pos'] - (value - start))
+                if octave is not None:
+                    note_octaves.append(octave)
             
         if full_width_episema is True:
             epi = self._create_episema_element()
@@ -493,6 +509,8 @@ class AomrMeiOutput(object):
     def _create_note_element(self, pname=None):
         note = mod.note_()
         note.id = self._idgen()
+        if self.stats is not None:
+            self.stats.count('ncs')
         note.pitchname = pname
         return note
     
@@ -539,8 +557,11 @@ class AomrMeiOutput(object):
     #     return alteration    
     
     def _idgen(self):
-        """ Returns a UUID. """
-        return "{0}-{1}".format('m', str(uuid.uuid4()))
+        """ Returns an id from the id strategy, hashed ids are keyed on
+            the current glyph's type and position. """
+        if self.glyph:
+            return self._ids.new_id(self.glyph['type'], tuple(self.glyph['coord']))
+        return self._ids.new_id(None)
 
     def __parse_contour(self, form):
         # removes the contour indicator from the neume
@@ -1,8 +1,46 @@
+import io
+import sys
+import contextlib
+import json
+import pickle
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import grouping
+import idgen
+import instrumentation
+import jsomr_io
+import neume_plans
+import pitch
+import tree_backends
+import zone_index
+from glyph_record import GlyphRecord, to_int
+from mei_writer import StreamBuilder, ZoneBuffer, SpooledZoneBuffer, MeiStreamWriter, element_events, document_events, gzip_text, comment_text, START, END, RAW
+
+# staff fragments for the process pool, see _generate_staves_parallel
+_worker_mei = None
+
+
+def _init_worker(mei_obj):
+    global _worker_mei
+    _worker_mei = mei_obj
+
+
+def _staff_fragment(staff):
+    return _worker_mei._generate_fragment(staff)
 
 
 class MeiOutput(object):
 
-    SCALE = ['c', 'd', 'e', 'f', 'g', 'a', 'b']
+    SURFACE_DEPTH = 3           # mei/music/facsimile/surface
+    SECTION_DEPTH = 5           # mei/music/body/mdiv/score/section
+    SPOOL_SIZE = 4 * 1024 ** 2  # staff text kept in memory before spilling to disk
+    PARALLEL_MIN_GLYPHS = 5000  # smaller pages aren't worth starting a process pool
+
+    # debug: tab-indented, with a comment of glyph names in every syllable
+    # compact: no comments or whitespace
+    # compressed: compact, gzipped at compress_level
+    OUTPUT_PROFILES = ('debug', 'compact', 'compressed')
 
     def __init__(self, incoming_data, **kwargs):
         self.incoming_data = incoming_data
@@ -12,12 +50,92 @@ class MeiOutput(object):
 
         # for storing during generation
         self.surface = False
+        self.streaming = False
+        self.backend = kwargs.get('backend', 'pymei')
+        self.builder = None
+        self.section = None
+
+        # xml:id strategy, see idgen
+        self.id_strategy = kwargs.get('ids', 'random')
+        self.id_prefix = kwargs.get('id_prefix', idgen.DEFAULT_PREFIX)
+
+        # staff fragments of the previous run, see _generate_stream
+        self.staff_cache = kwargs.get('staff_cache')
+        self.dirty_staves = []
+        if self.staff_cache is not None and self.id_strategy == 'counter':
+            raise ValueError('incremental conversion needs random or hashed ids')
+
+        # processes generating staves, 1 for serial
+        self.workers = kwargs.get('workers', 1)
+
+        # low memory: staves are released once generated, zones are spooled
+        # as text, and the page can only be converted once
+        self.low_memory = kwargs.get('low_memory', False)
+        self.converted = False
+        if self.low_memory and self.staff_cache is not None:
+            raise ValueError('incremental conversion keeps every staff, it has no low-memory mode')
+
+        # stage timings and counters, see instrumentation. trace_memory adds
+        # the peak traced memory, at the cost of a much slower run
+        self.trace_memory = kwargs.get('trace_memory', False)
+        self.stats = instrumentation.get_stats(kwargs.get('stats') or self.trace_memory)
+        self.profile = kwargs.get('profile')
+        self.profile_path = kwargs.get('profile_path')
+        instrumentation.check_profiler(self.profile)
+
+        # output layout, see OUTPUT_PROFILES
+        self.output_profile = kwargs.get('output_profile', 'debug')
+        self.compress_level = kwargs.get('compress_level', 6)
+        if self.output_profile not in self.OUTPUT_PROFILES:
+            raise ValueError('unknown output profile: %s' % self.output_profile)
+        self.comments = self.output_profile == 'debug'
+        (self.indent, self.newline) = ('\t', '\n') if self.output_profile == 'debug' else ('', '')
+
+        # zones with the same box on a staff share one <zone>, e.g. both
+        # halves of a ligature. zone_ids is the staff's table when sharing,
+        # stats count the zones saved as zones_shared
+        self.share_zones = kwargs.get('share_zones', False)
+        self.zone_ids = None
+
+        # spatial index of the zones and the elements using them, made anew
+        # by every conversion, see zone_index
+        self.index_zones = kwargs.get('zone_index', False)
+        self.zone_cell_size = kwargs.get('zone_cell_size', zone_index.DEFAULT_CELL_SIZE)
+        self.zone_index = None
 
         # for grouping
-        self.avg_punc_width = self._avg_punctum(list(filter(lambda g: g['glyph']['name'] == 'neume.punctum', incoming_data['glyphs'])))
         self.max_neume_spacing = kwargs['max_neume_spacing']
         self.max_group_size = kwargs['max_group_size']
 
+        # glyph records bucketed by staff, sorted by ulx
+        self.glyph_store = None
+        self.group_ids = None
+        with instrumentation.traced_memory(self.stats if self.trace_memory else None):
+            if self.stats is not None:
+                self.stats.push('index')
+            if 'glyph_store' in incoming_data:
+                self._index_glyph_store(incoming_data['glyph_store'], kwargs.get('vectorized'))
+            elif kwargs.get('columnar') or kwargs.get('vectorized'):
+                self._index_glyph_store(incoming_data['glyphs'], kwargs.get('vectorized'))
+            else:
+                self.glyphs = GlyphRecord.from_glyphs(incoming_data['glyphs'])
+                self.staff_glyphs = self._index_glyphs(self.glyphs)
+                self.avg_punc_width = self._avg_punctum(list(filter(lambda g: g.name == 'neume.punctum', self.glyphs)))
+            if self.stats is not None:
+                self.stats.pop()
+                if self.glyph_store is not None:
+                    (total, skipped) = (len(self.glyph_store), self.glyph_store.category_count('skip'))
+                else:
+                    (total, skipped) = (len(self.glyphs), sum(1 for g in self.glyphs if g.category == 'skip'))
+                self.stats.count('glyphs', total)
+                self.stats.count('skipped', skipped)
+
+        # the glyph dicts and the page's records are only read while
+        # indexing, staves hold what generation needs
+        if self.low_memory:
+            self.incoming_data = dict((k, v) for (k, v) in incoming_data.items() if k != 'glyphs')
+            self.glyphs = None
+
         # nc interpolating
         self.lig_width = 2  # width of ligature in whole punctums
 
@@ -26,25 +144,186 @@ class MeiOutput(object):
     ####################
 
     def run(self):
-        return self._createDoc()
+        # the document as text, or as gzipped bytes for the compressed profile
+        if self.output_profile == 'compressed':
+            out = io.BytesIO()
+            self.write(out)
+            return out.getvalue()
+
+        with self._instrumented():
+            if self.staff_cache is not None or self.workers > 1 or self.low_memory or not self.comments:
+                out = io.StringIO()     # cached, pooled and released staves and compact text are stream events
+                self._write(out)
+                return out.getvalue()
+            return self._createDoc()
 
     def add_Image(self, image):
         self.original_image = image
 
+    def get_stats(self):
+        # timings in seconds and counters so far, or None without stats
+        if self.stats is None:
+            return None
+        return self.stats.as_dict()
+
+    def get_staff_glyphs(self, staff_no):
+        if self.glyph_store is not None:
+            return self.glyph_store.records(self.staff_rows.get(to_int(staff_no), []))
+        return self.staff_glyphs.get(to_int(staff_no), [])
+
+    def write(self, fileobj):
+        # streams the document to fileobj, one staff at a time. staff text is
+        # spooled until the zones, which come first, are complete. fileobj
+        # is binary for the compressed profile
+        with self._instrumented():
+            if self.output_profile == 'compressed':
+                with gzip_text(fileobj, self.compress_level) as text:
+                    self._write(text)
+            else:
+                self._write(fileobj)
+
+    def iter_events(self):
+        # document events in order, without building the element tree. the
+        # zones come first but are only complete once every staff is made, so
+        # staves are pickled to a spooled file and replayed a staff at a time.
+        # in low-memory mode the zones come as one RAW event
+        with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE) as staves:
+            def sink(staffEvents):
+                pickle.dump(list(staffEvents), staves, pickle.HIGHEST_PROTOCOL)
+
+            skeleton, zones = self._generate_stream(sink)
+            try:
+                for event in self._document_events(skeleton, zones, self._replay_staves(staves)):
+                    yield event
+            finally:
+                zones.close()
+
+    def write_page(self, surfaceFile, sectionFile, n):
+        # this page as page n of a multi-page document, see multi_page: its
+        # <surface> goes to surfaceFile, and a <pb /> followed by its staves
+        # to sectionFile
+        with self._instrumented():
+            sectionWriter = self._stream_writer(sectionFile, self.SECTION_DEPTH + 1)
+            pages = []
+
+            def sink(staffEvents):
+                if not pages:
+                    pages.append(self._write_pb(sectionWriter, n))
+                sectionWriter.write_events(staffEvents)
+
+            skeleton, zones = self._generate_stream(sink)
+            try:
+                if not pages:
+                    self._write_pb(sectionWriter, n)
+
+                surface = self._find_element(skeleton, 'surface')
+                surfaceWriter = self._stream_writer(surfaceFile, self.SURFACE_DEPTH)
+                for event in element_events(surface):
+                    if event[0] == END and event[1] == 'surface':
+                        surfaceWriter.write_events(zones.events())
+                    surfaceWriter.write(event)
+            finally:
+                zones.close()
+
     #####################
     # Utility Functions
     #####################
 
-    def _add_attributes(self, el, attributes):
-        for a in attributes:
-            if attributes[a]:
-                el.addAttribute(a, attributes[a])
+    def _write_pb(self, writer, n):
+        # the zone buffer has taken the surface's place and id
+        pb = self.builder.element(self.section, "pb", {'n': str(n), 'facs': self.surface.id})
+        writer.write_events(element_events(self.section.children.pop()))
+        return pb
+
+    def _find_element(self, el, name):
+        if el.name == name:
+            return el
+        for child in el.children:
+            found = self._find_element(child, name)
+            if found is not None:
+                return found
+        return None
+
+    def _instrumented(self):
+        # the profiler runs inside memory tracing, so it doesn't skew the peak
+        stack = contextlib.ExitStack()
+        stack.enter_context(instrumentation.traced_memory(self.stats if self.trace_memory else None))
+        stack.enter_context(instrumentation.profiled(self.profile, self.profile_path))
+        return stack
+
+    def _write(self, fileobj):
+        # the spooled staves, the zones and the stats stages are closed even
+        # when generation fails
+        stats = self.stats
+        with contextlib.ExitStack() as stack:
+            body = stack.enter_context(tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE, mode='w+'))
+            staffWriter = self._stream_writer(body, self.SECTION_DEPTH + 1)
+            sink = staffWriter.write_events
+            if stats is not None:
+                sink = stats.timed('serialize', sink)
+            with stats.stage('build') if stats is not None else contextlib.nullcontext():
+                skeleton, zones = self._generate_stream(sink)
+            stack.callback(zones.close)
+
+            with stats.stage('serialize') if stats is not None else contextlib.nullcontext():
+                writer = self._stream_writer(fileobj)
+                writer.write_declaration()
+                writer.write_events(self._document_events(skeleton, zones, [(RAW, body)] if body.tell() else []))
+
+    def _index_glyphs(self, glyphs):
+        # one pass over the page: bucket by staff and drop skips
+        staves = {}
+        for g in glyphs:
+            if g.category == 'skip':
+                continue
+            staves.setdefault(g.staff, []).append(g)
+
+        for staffGlyphs in staves.values():
+            staffGlyphs.sort(key=lambda g: g.ulx)
+
+        return staves
+
+    def _index_glyph_store(self, glyphs, vectorized):
+        # glyphs are JSOMR glyph dicts, or a store loaded by jsomr_columnar.
+        # numpy is only needed for the columnar store
+        from glyph_store import GlyphStore
+        import vector_grouping
+
+        # records are only made per staff, see _process_rows
+        self.glyph_store = glyphs if isinstance(glyphs, GlyphStore) else GlyphStore.from_glyphs(glyphs)
+        self.glyphs = None
+        self.staff_rows = self.glyph_store.staff_index()
+        self.avg_punc_width = self.glyph_store.mean_width('neume.punctum')
+
+        # group every staff of the page at once
+        if vectorized:
+            self.group_ids = vector_grouping.group_ids(self.glyph_store, int(self.avg_punc_width * self.max_neume_spacing), self.max_group_size)
+
+    def _release_staff(self, staff_no):
+        # the grouped glyphs being generated are the last references to the
+        # staff's records. the store's columns stay, they are a few bytes a row
+        if self.glyph_store is not None:
+            self.staff_rows.pop(to_int(staff_no), None)
+        else:
+            self.staff_glyphs.pop(to_int(staff_no), None)
+
+    def _stream_writer(self, fileobj, depth=0):
+        return MeiStreamWriter(fileobj, depth, self.indent, self.newline)
+
+    def _new_zone_index(self):
+        if not self.index_zones:
+            return None
+        return zone_index.ZoneIndex(self.zone_cell_size)
+
+    def _new_ids(self):
+        # fresh per document, so counter and hashed ids repeat across runs
+        return idgen.get_ids(self.id_strategy, self.id_prefix)
 
     def _avg_punctum(self, punctums):
 
         width_sum = 0
         for p in punctums:
-            width_sum += p['glyph']['bounding_box']['ncols']
+            width_sum += p.ncols
         return width_sum / len(punctums)
 
     ##################
@@ -52,46 +331,43 @@ class MeiOutput(object):
     ##################
 
     def _createDoc(self):
-        doc = self._generate_doc()
-
-        return documentToText(doc)
-
-    def _generate_doc(self):
-        meiDoc = MeiDocument()
-        self._generate_mei(meiDoc)
+        stats = self.stats
+        self.builder = tree_backends.get_builder(self.backend, self._new_ids())
+        self.zone_index = self._new_zone_index()
+        if stats is None:
+            return self.builder.to_text(self._generate_mei())
 
-        return meiDoc
+        planHits = neume_plans.compile_plan.cache_info().hits
+        with stats.stage('build'):
+            root = self._generate_mei()
+        stats.count('plan_cache_hits', neume_plans.compile_plan.cache_info().hits - planHits)
 
-    def _generate_mei(self, parent):
-        el = MeiElement("mei")
-        parent.root = el
+        with stats.stage('serialize'):
+            return self.builder.to_text(root)
 
-        el.addAttribute("meiversion", self.version)
+    def _generate_mei(self):
+        el = self.builder.element(None, "mei", {'meiversion': self.version})
 
         self._generate_meiHead(el)
         self._generate_music(el)
 
+        return el
+
     def _generate_meiHead(self, parent):
-        el = MeiElement("meiHead")
-        parent.addChild(el)
+        self.builder.element(parent, "meiHead")
 
     def _generate_music(self, parent):
-        el = MeiElement("music")
-        parent.addChild(el)
+        el = self.builder.element(parent, "music")
 
         self._generate_facsimile(el)
         self._generate_body(el)
 
     def _generate_facsimile(self, parent):
-        el = MeiElement("facsimile")
-        parent.addChild(el)
+        el = self.builder.element(parent, "facsimile")
 
         self._generate_surface(el)
 
     def _generate_surface(self, parent):
-        el = MeiElement("surface")
-        parent.addChild(el)
-
         attribs = {
             'ulx': str(self.incoming_data['page']['bounding_box']['ulx']),
             'uly': str(self.incoming_data['page']['bounding_box']['uly']),
@@ -99,21 +375,26 @@ class MeiOutput(object):
             'lry': str(self.incoming_data['page']['bounding_box']['nrows']),
         }
 
-        self._add_attributes(el, attribs)
+        el = self.builder.element(parent, "surface", attribs)
         self._generate_graphic(el)
         self.surface = el
 
     def _generate_graphic(self, parent):
-        el = MeiElement("graphic")
-        parent.addChild(el)
-
-        el.addAttribute('xlink:href', str(self.original_image))
+        self.builder.element(parent, "graphic", {'xlink:href': str(self.original_image)})
 
     def _generate_zone(self, parent, bounding_box):
-        (nrows, ulx, uly, ncols) = bounding_box.values()
-
-        el = MeiElement("zone")
-        parent.addChild(el)
+        ulx = bounding_box['ulx']
+        uly = bounding_box['uly']
+        ncols = bounding_box['ncols']
+        nrows = bounding_box['nrows']
+
+        zoneIds = self.zone_ids
+        if zoneIds is not None:
+            key = (ulx, uly, ncols, nrows)
+            if key in zoneIds:
+                if self.stats is not None:
+                    self.stats.count('zones_shared')
+                return zoneIds[key]
 
         attribs = {
             'ulx': str(ulx),
@@ -122,87 +403,105 @@ class MeiOutput(object):
             'lry': str(uly + nrows),
         }
 
-        self._add_attributes(el, attribs)
+        el = self.builder.element(parent, "zone", attribs)
+        if self.stats is not None:
+            self.stats.count('zones')
+
+        zoneId = self.builder.get_id(el)   # the facsimile reference id
+        if zoneIds is not None:
+            zoneIds[key] = zoneId
+        if self.zone_index is not None:
+            self.zone_index.add_zone(zoneId, ulx, uly, ulx + ncols, uly + nrows)
+        return zoneId
 
-        return el.getId()   # returns the facsimile reference id
+    def _generate_facs_element(self, parent, name, attribs):
+        # an element with a zone, linked to it in the zone index
+        el = self.builder.element(parent, name, attribs)
+        if self.zone_index is not None:
+            self.zone_index.link(attribs['facs'], self.builder.get_id(el), name)
+        return el
 
     def _generate_body(self, parent):
-        el = MeiElement("body")
-        parent.addChild(el)
+        el = self.builder.element(parent, "body")
 
         self._generate_mdiv(el)
 
     def _generate_mdiv(self, parent):
-        el = MeiElement("mdiv")
-        parent.addChild(el)
+        el = self.builder.element(parent, "mdiv")
 
         self._generate_score(el)
 
     def _generate_score(self, parent):
-        el = MeiElement("score")
-        parent.addChild(el)
+        el = self.builder.element(parent, "score")
 
         self._generate_scoreDef(el)
         self._generate_section(el)
 
     def _generate_scoreDef(self, parent):
-        el = MeiElement("scoreDef")
-        parent.addChild(el)
+        el = self.builder.element(parent, "scoreDef")
 
         self._generate_staffGrp(el)
 
     def _generate_staffGrp(self, parent):
-        el = MeiElement("staffGrp")
-        parent.addChild(el)
+        el = self.builder.element(parent, "staffGrp")
 
         self._generate_staffDef(el)
 
     def _generate_staffDef(self, parent):
-        el = MeiElement("staffDef")
-        parent.addChild(el)
+        attribs = {
+            'n': '1',   # use first staff parameters
+            'lines': str(self.incoming_data['staves'][0]['num_lines']),
+            'notationtype': 'neume',
+        }
 
-        el.addAttribute('n', '1')   # use first staff parameters
-        el.addAttribute('lines', str(self.incoming_data['staves'][0]['num_lines']))
-        el.addAttribute('notationtype', 'neume')
+        self.builder.element(parent, "staffDef", attribs)
 
     def _generate_section(self, parent):
-        el = MeiElement("section")
-        parent.addChild(el)
+        el = self.builder.element(parent, "section")
+
+        if self.streaming:
+            self.section = el
+            return      # staves are streamed separately
 
         for s in self.incoming_data['staves']:
             self._generate_staff(el, s)     # generate each staff
 
     def _generate_staff(self, parent, staff):
-        el = MeiElement("staff")
-        parent.addChild(el)
+        # a table per staff keeps staves independent, for the pool and cache
+        if self.share_zones:
+            self.zone_ids = {}
 
-        zoneId = self._generate_zone(self.surface, staff['bounding_box'])
-        el.addAttribute('facs', zoneId)
-        el.addAttribute('n', str(staff['staff_no']))
-        el.addAttribute('lines', str(staff['num_lines']))
-        el.addAttribute('line_positions', str(staff['line_positions']))
+        attribs = {
+            'facs': self._generate_zone(self.surface, staff['bounding_box']),
+            'n': str(staff['staff_no']),
+            'lines': str(staff['num_lines']),
+        }
+        if 'line_positions' in staff:
+            attribs['line_positions'] = str(staff['line_positions'])
 
-        self._generate_layer(el)
+        el = self._generate_facs_element(parent, "staff", attribs)
 
-    def _generate_layer(self, parent):
-        el = MeiElement("layer")
-        parent.addChild(el)
+        self._generate_layer(el, staff)
 
-        # get all glyphs on THIS staff
-        glyphs = list(filter(lambda g: g['pitch']['staff'] ==
-                             el.getParent().getAttribute('n').value
-                             and g['glyph']['name'].split('.')[0] != 'skip',
-                             self.incoming_data['glyphs']))
+    def _generate_layer(self, parent, staff):
+        el = self.builder.element(parent, "layer")
 
-        # process all glyphs
-        processedGroupedGlyphs = self._process_glyphs(glyphs)
+        # get and process all glyphs on THIS staff
+        if self.stats is not None:
+            self.stats.push('group')
+        if self.glyph_store is not None:
+            processedGroupedGlyphs = self._process_rows(self.staff_rows.get(staff['staff_no'], []))
+        else:
+            processedGroupedGlyphs = self._process_glyphs(self.get_staff_glyphs(staff['staff_no']))
+        if self.stats is not None:
+            self.stats.pop()
+        if self.low_memory:
+            self._release_staff(staff['staff_no'])
 
-        # print('\n\n', el.getParent().getAttribute('n').value)
         for groupedGlyph in processedGroupedGlyphs:
             glyph = groupedGlyph[0]   # define first glyph
-            glyphName = glyph['glyph']['name'].split('.')[0]
+            glyphName = glyph.category
 
-            # print(glyph['glyph']['bounding_box']['ulx'], glyph['glyph']['name'])
             if glyphName == 'accid':
                 self._generate_accidental(el, glyph)
             elif glyphName == 'clef':
@@ -214,137 +513,271 @@ class MeiOutput(object):
             elif glyphName == 'neume':
                 self._generate_syllable(el, groupedGlyph)
 
+    ######################
+    # Stream Generation
+    ######################
+
+    def _generate_stream(self, sink):
+        # returns the document without staves and the zone buffer, passing
+        # each staff's events to sink as soon as it is generated
+        if self.low_memory and self.converted:
+            raise RuntimeError('a low-memory MeiOutput has released its glyphs, it can only be converted once')
+        self.converted = True
+
+        self.builder = StreamBuilder(self._new_ids())
+        self.zone_index = self._new_zone_index()
+        self.streaming = True
+        planHits = neume_plans.compile_plan.cache_info().hits
+        zones = None
+        try:
+            skeleton = self._generate_mei()
+
+            if self.low_memory:
+                zones = SpooledZoneBuffer(self.surface.id, self.SURFACE_DEPTH + 1, self.SPOOL_SIZE, self.indent, self.newline)
+            else:
+                zones = ZoneBuffer(self.surface.id)
+            self.surface = zones
+            if self.staff_cache is not None:
+                self._generate_staves_incremental(sink, zones)
+            elif self._use_pool():
+                self._generate_staves_parallel(sink, zones)
+            else:
+                for s in self.incoming_data['staves']:
+                    self._generate_staff(self.section, s)
+                    sink(element_events(self.section.children.pop()))
+        except BaseException:
+            if zones is not None:
+                zones.close()
+            raise
+        finally:
+            self.streaming = False
+        if self.stats is not None:
+            self.stats.count('plan_cache_hits', neume_plans.compile_plan.cache_info().hits - planHits)
+
+        return skeleton, zones
+
+    def _generate_staves_incremental(self, sink, zones):
+        # staves whose fingerprint is in staff_cache reuse their events and
+        # zones, the rest are generated. staff_cache is left holding this run
+        fragments = {}
+        self.dirty_staves = []
+
+        for s in self.incoming_data['staves']:
+            key = self._staff_key(s)
+            if key in self.staff_cache:
+                (staffEvents, staffZones) = self.staff_cache[key]
+                self.builder.ids.reserve(self._fragment_ids(staffEvents, staffZones))
+                zones.zones.extend(staffZones)
+                if self.zone_index is not None:
+                    self.zone_index.add_fragment(staffEvents, staffZones)
+                if self.stats is not None:
+                    self.stats.count('cached_staves')
+            else:
+                first = len(zones.zones)
+                self._generate_staff(self.section, s)
+                staffEvents = list(element_events(self.section.children.pop()))
+                staffZones = zones.zones[first:]
+                self.dirty_staves.append(s['staff_no'])
+
+            fragments[key] = (staffEvents, staffZones)
+            sink(staffEvents)
+
+        self.staff_cache.clear()
+        self.staff_cache.update(fragments)
+
+    def _use_pool(self):
+        # every worker would hold a copy of the page
+        if self.workers <= 1 or self.low_memory or len(self.incoming_data['staves']) < 2:
+            return False
+        staves = self.staff_rows if self.glyph_store is not None else self.staff_glyphs
+        return sum(len(g) for g in staves.values()) >= self.PARALLEL_MIN_GLYPHS
+
+    def _generate_staves_parallel(self, sink, zones):
+        # staves are generated by a process pool and stitched in staff order,
+        # with their ids renumbered as if they had been made here
+        ids = self.builder.ids
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self,)) as pool:
+            for (staffEvents, staffZones, state, counters) in pool.map(_staff_fragment, self.incoming_data['staves']):
+                if counters:
+                    self.stats.merge(counters)
+                remap = ids.adopt(state)
+                if remap:
+                    (staffEvents, staffZones) = self._remap_fragment(staffEvents, staffZones, remap)
+
+                zones.zones.extend(staffZones)
+                if self.zone_index is not None:
+                    self.zone_index.add_fragment(staffEvents, staffZones)
+                sink(staffEvents)
+
+    def _generate_fragment(self, staff):
+        # a staff's events and zones, made in a pool worker. only counters
+        # are sent back, worker timings would overlap the parent's
+        ids = self.builder.ids.fork()
+        self.builder = StreamBuilder(ids)
+        zones = ZoneBuffer(self.surface.id)
+        self.surface = zones
+        self.zone_index = None     # indexed from the fragment by the parent
+        self.stats = instrumentation.get_stats(self.stats is not None)
+        planHits = neume_plans.compile_plan.cache_info().hits
+
+        self._generate_staff(self.section, staff)
+        counters = None
+        if self.stats is not None:
+            self.stats.count('plan_cache_hits', neume_plans.compile_plan.cache_info().hits - planHits)
+            counters = self.stats.counters
+        return list(element_events(self.section.children.pop())), zones.zones, ids.state(), counters
+
+    def _remap_fragment(self, staffEvents, staffZones, remap):
+        events = []
+        for event in staffEvents:
+            if event[0] == START:
+                event = (START, event[1], list((a, remap(v) if a in ('xml:id', 'facs') else v) for (a, v) in event[2]))
+            events.append(event)
+
+        return events, list((remap(z[0]),) + z[1:] for z in staffZones)
+
+    def _staff_key(self, staff):
+        # everything a staff's output depends on
+        settings = (self.max_neume_spacing, self.max_group_size, self.avg_punc_width, self.lig_width,
+                    self.id_strategy, self.id_prefix, self.share_zones, self.comments)
+        glyphs = list(g.key() for g in self.get_staff_glyphs(staff['staff_no']))
+
+        text = json.dumps([staff, settings, glyphs], sort_keys=True)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _fragment_ids(self, staffEvents, staffZones):
+        for event in staffEvents:
+            if event[0] == START:
+                yield event[2][0][1]    # xml:id comes first
+        for zone in staffZones:
+            yield zone[0]
+
+    def _replay_staves(self, staves):
+        staves.seek(0)
+        while True:
+            try:
+                staffEvents = pickle.load(staves)
+            except EOFError:
+                return
+            for event in staffEvents:
+                yield event
+
+    def _document_events(self, skeleton, zones, staffEvents):
+        for event in document_events(skeleton):
+            if event[0] == END and event[1] == 'surface':
+                for zone in zones.events():
+                    yield zone
+            elif event[0] == END and event[1] == 'section':
+                for staffEvent in staffEvents:
+                    yield staffEvent
+            yield event
+
     def _generate_comment(self, parent, text):
-        el = MeiElement("_comment")
-        el.setValue(str(text))
-        parent.addChild(el)
+        if self.comments:
+            self.builder.comment(parent, comment_text(str(text)))
 
     ####################
     # Glyph Generation
     ####################
 
     def _generate_accidental(self, parent, glyph):
-        el = MeiElement("accid")
-        parent.addChild(el)
+        attribs = {
+            'facs': self._generate_zone(self.surface, glyph.bounding_box),
+            'accid': glyph.subtype,
+        }
 
-        zoneId = self._generate_zone(self.surface, glyph['glyph']['bounding_box'])
-        el.addAttribute('facs', zoneId)
-        el.addAttribute("accid", glyph['glyph']['name'].split('.')[1])
+        self._generate_facs_element(parent, "accid", attribs)
 
     def _generate_clef(self, parent, glyph):
-        el = MeiElement("clef")
-        parent.addChild(el)
-
-        el.addAttribute('shape', str(glyph['glyph']['name'].split('.')[1].upper()))
-        el.addAttribute('line', str(glyph['pitch']['strt_pos']))
+        attribs = {
+            'shape': str(glyph.subtype.upper()),
+            'line': str(glyph.strt_pos),
+            'facs': self._generate_zone(self.surface, glyph.bounding_box),
+        }
 
-        zoneId = self._generate_zone(self.surface, glyph['glyph']['bounding_box'])
-        el.addAttribute('facs', zoneId)
+        self._generate_facs_element(parent, "clef", attribs)
 
     def _generate_custos(self, parent, glyph):
-        el = MeiElement("custos")
-        parent.addChild(el)
+        attribs = {
+            'facs': self._generate_zone(self.surface, glyph.bounding_box),
+            'oct': str(glyph.octave),
+            'pname': str(glyph.note),
+        }
 
-        zoneId = self._generate_zone(self.surface, glyph['glyph']['bounding_box'])
-        el.addAttribute('facs', zoneId)
-        el.addAttribute("oct", str(glyph['pitch']['octave']))
-        el.addAttribute("pname", str(glyph['pitch']['note']))
+        self._generate_facs_element(parent, "custos", attribs)
 
     def _generate_division(self, parent, glyph):
-        el = MeiElement("division")
-        parent.addChild(el)
+        attribs = {
+            'facs': self._generate_zone(self.surface, glyph.bounding_box),
+            'form': glyph.subtype,
+        }
 
-        zoneId = self._generate_zone(self.surface, glyph['glyph']['bounding_box'])
-        el.addAttribute('facs', zoneId)
-        el.addAttribute("form", glyph['glyph']['name'].split('.')[1])
+        self._generate_facs_element(parent, "division", attribs)
 
     def _generate_syllable(self, parent, glyphs):
-        el = MeiElement("syllable")
-        parent.addChild(el)
+        el = self.builder.element(parent, "syllable")
+        if self.stats is not None:
+            self.stats.count('groups')
 
         # self._generate_syl(el, glyph)
-        self._generate_comment(el, ', '.join('.'.join(n['glyph']['name'].split('.')[1:]) for n in glyphs))
+        self._generate_comment(el, ', '.join('.'.join(n.tokens[1:]) for n in glyphs))
         self._generate_neume(el, glyphs)
 
     def _generate_neume(self, parent, glyphs):
-        el = MeiElement("neume")
-        parent.addChild(el)
+        el = self.builder.element(parent, "neume")
 
         for g in glyphs:
             self._generate_nc(el, g)
 
     def _generate_nc(self, parent, glyph):
-        el = MeiElement("nc")
-        parent.addChild(el)
-
-        name = glyph['glyph']['name'].split('.')
-        pitch = [glyph['pitch']['note'], glyph['pitch']['octave'], glyph['pitch']['clef'].split('.')[1]]
-        bounding_box = None
-
-        singular = len(name) < 3
-        zoneId = False
-
-        # print('\n', name, glyph['pitch']['staff'])
-
-        # if one primative, bounding box already exists
-        if singular:
-            bounding_box = glyph['glyph']['bounding_box']
-            zoneId = self._generate_zone(self.surface, bounding_box)
-            el.addAttribute('facs', zoneId)
-
-        # otherwise, interpolate bounding_boxes for each nc
-        else:
-            bounding_boxes = self._get_zonified_bounding_boxes(glyph)
-            bounding_box = bounding_boxes[0]
-            zoneId = self._generate_zone(self.surface, bounding_box)
-            el.addAttribute('facs', zoneId)
-
-        self._complete_primitive(name[1], parent, el, pitch, bounding_box)
-
-        if not singular:
-            self._generate_nc_rec(parent, self._get_relative_pitch(pitch, name[1]), name[2:], bounding_boxes[1:])
-
-    def _generate_nc_rec(self, parent, pitch, acc, bounding_boxes):
-        el = MeiElement("nc")
-        parent.addChild(el)
-
-        # print(bounding_boxes[0])
-        bounding_box = bounding_boxes[0]
-        zoneId = self._generate_zone(self.surface, bounding_box)
-        el.addAttribute('facs', zoneId)
-
-        newPitch = self._get_new_pitch(pitch, acc[0][0], acc[0][1])
-        self._complete_primitive(acc[1], parent, el, newPitch, bounding_box)
-
-        if acc[2:]:  # recursive step
-            self._generate_nc_rec(parent, self._get_relative_pitch(newPitch, acc[1]), acc[2:], bounding_boxes[1:])
+        stats = self.stats
+        if stats is not None:
+            stats.push('zonify')
+        plan = neume_plans.compile_plan(glyph.name, self.lig_width)
+        boxes = plan.place(glyph.bounding_box)
+        if stats is not None:
+            stats.pop()
+            ligatures = sum(1 for (primitive, step) in plan.ncs if 'ligature' in primitive)
+            stats.count('ncs', len(plan.ncs) + ligatures)
+            stats.count('ligatures', ligatures)
+        start = pitch.to_diatonic(glyph.note, glyph.octave)
+
+        # one nc per primitive, each placed in its interpolated zone
+        for (primitive, step), offset, bounding_box in zip(plan.ncs, plan.offsets, boxes):
+            self._generate_primitive(parent, primitive, start + offset, bounding_box)
 
     ########################
     # Generation Utilities
     ########################
 
-    def _complete_primitive(self, name, parent, el, pitch, bounding_box):
-        el.addAttribute('pname', str(pitch[0]))
-        el.addAttribute('oct', str(pitch[1]))
+    def _generate_primitive(self, parent, name, value, bounding_box):
+        (note, octave) = pitch.from_diatonic(value)
+        attribs = {
+            'facs': self._generate_zone(self.surface, bounding_box),
+            'pname': note,
+            'oct': str(octave),
+        }
 
         if 'punctum' in name:
             pass
         elif 'inclinatum' in name:
-            el.addAttribute('name', 'inclinatum')
+            attribs['name'] = 'inclinatum'
         elif 'ligature' in name:
-            el.addAttribute('ligature', 'true')
-
-            # generate second part of ligature
-            el2 = MeiElement("nc")
-            parent.addChild(el2)
-            relativePitch = self._get_relative_pitch(pitch, name)
-
-            zoneId = self._generate_zone(self.surface, bounding_box)
-            el2.addAttribute('facs', zoneId)
+            attribs['ligature'] = 'true'
+
+        self._generate_facs_element(parent, "nc", attribs)
+
+        # generate second part of ligature
+        if 'ligature' in attribs:
+            (note, octave) = pitch.from_diatonic(value + pitch.ligature_steps(name))
+            attribs = {
+                'facs': self._generate_zone(self.surface, bounding_box),
+                'pname': note,
+                'oct': str(octave),
+                'ligature': 'true',
+            }
 
-            el2.addAttribute('pname', relativePitch[0])
-            el2.addAttribute('oct', relativePitch[1])
-            el2.addAttribute('ligature', 'true')
+            self._generate_facs_element(parent, "nc", attribs)
 
     ##################
     # Complex Neumes
@@ -353,179 +786,40 @@ class MeiOutput(object):
     def _get_new_pitch(self, startPitch, contour, interval):
         (startNote, startOctave, clef) = startPitch
 
-        startOctave = int(startOctave)
-        interval = int(interval) - 1  # because intervals are 1 note off
-        SCALE = self.SCALE
-
-        if contour == 'u':      # upwards
-            newOctave = startOctave + \
-                int((SCALE.index(startNote) + interval) / len(SCALE))
-            newNote = SCALE[(SCALE.index(startNote) + interval) % len(SCALE)]
-
-        elif contour == 'd':    # downwards
-            newOctave = startOctave - \
-                int((len(SCALE) - SCALE.index(startNote) - 1 + interval) / len(SCALE))
-            newNote = SCALE[(SCALE.index(startNote) - interval) % len(SCALE)]
-
-        elif contour == 's':   # repetition
-            newOctave = startOctave
-            newNote = startNote
+        value = pitch.to_diatonic(startNote, startOctave) + pitch.steps(contour, interval)
+        (newNote, newOctave) = pitch.from_diatonic(value)
 
         return [newNote, str(newOctave), clef]
 
-    def _get_relative_pitch(self, pitch, name):
+    def _get_relative_pitch(self, startPitch, name):
         if 'ligature' in name:   # if ligature, find/return lower pitch
-            return self._get_new_pitch(pitch, 'd', name.split('ligature')[1])
+            return self._get_new_pitch(startPitch, 'd', name.split('ligature')[1])
         else:
-            return pitch
+            return startPitch
 
     #########################
     # Zonify Bounding Boxes
     #########################
 
     def _get_zonified_bounding_boxes(self, glyph):
-
-        # print(glyph)
-        bounding_box = glyph['glyph']['bounding_box']
-        num_ncs = int(len(glyph['glyph']['name'].split('.')) / 2)
-
-        name = glyph['glyph']['name'].split('.')
-        nc_names = list(name[2 * i: (2 * i) + 2] for i in range(0, num_ncs))
-
-        contours = self._find_numeric_contours(nc_names)
-        zone_pos = self._find_zone_positions(nc_names, contours)
-
-        x_min, x_max, y_min, y_max = self._find_zone_edges(nc_names, contours)
-        x_dim = x_max
-        y_dim = y_max - y_min
-        zone_bounding = (x_dim, y_dim)
-
-        bounding_boxes = self._translate_zone_pos_to_bounding_boxes(zone_pos, zone_bounding, bounding_box)
-
-        # print('\n\n')
-
-        return bounding_boxes
-
-    def _translate_zone_pos_to_bounding_boxes(self, zone_pos, zone_bounding, glyph_bounding):
-        bounding_boxes = []
-        x_dim, y_dim = zone_bounding        # x_dim relates to ncols, y_dim relates to nrows
-        ncols = glyph_bounding['ncols']
-        nrows = glyph_bounding['nrows']
-        if not self._zone_pos_is_positive(zone_pos):
-            zone_pos = self._shift_zone_pos_positive(zone_pos)
-
-        for nc in zone_pos:
-            bounding_box = {
-                'nrows': int(nrows * (nc[3] - nc[1]) / y_dim),
-                'ulx': int(ncols * (nc[0] / x_dim)) + glyph_bounding['ulx'],
-                'uly': int(nrows * (nc[1] / y_dim)) + glyph_bounding['uly'],
-                'ncols': int(ncols * (nc[2] - nc[0]) / x_dim),
-            }
-            bounding_boxes.append(bounding_box)
-
-        #     print(nc)
-        #     print(bounding_box)
-
-        # print(x_dim, y_dim)
-        # print(glyph_bounding['ulx'], glyph_bounding['uly'], glyph_bounding['ncols'], glyph_bounding['nrows'])
-        return bounding_boxes
+        # takes a JSOMR glyph
+        plan = neume_plans.compile_plan(glyph['glyph']['name'], self.lig_width)
+        return plan.place(glyph['glyph']['bounding_box'])
 
     def _find_numeric_contours(self, nc_names):
-        contours = [0]
-        for x in nc_names:
-
-            if 'ligature' in x[1]:
-                contours.append(-(int(x[1].split('ligature')[1]) - 1))
-
-            if x[0][0] == 'u':
-                contours.append(int(x[0][1:]) - 1)
-            elif x[0][0] == 'd':
-                contours.append(-(int(x[0][1:]) - 1))
-            elif x[0][0] == 's':
-                contours.append(0)
-
-        return contours
+        return neume_plans.find_numeric_contours(nc_names)
 
     def _find_zone_positions(self, nc_names, contours):
-
-        # returns a 'relative' bounding_box for each nc
-        zone_pos = []
-        nudge = 0   # each lig requires a contour indices nudge
-
-        # get relative bounding box of first nc
-        r_ulx = 0
-        r_uly = 0
-
-        # need to do first glyph manually
-        if 'ligature' in nc_names[0][1]:
-            r_lrx = r_ulx + self.lig_width
-            r_lry = r_uly - contours[1] + 1
-            nudge += 1
-        else:
-            r_lrx = r_ulx + 1
-            r_lry = r_uly + 1
-        zone_pos.append([r_ulx, r_uly, r_lrx, r_lry])
-
-        # print(nc_names, contours)
-        # print(zone_pos)
-        # get the rest relative to the first
-        for i, nc in enumerate(nc_names[1:]):
-            r_ulx = r_lrx
-            r_uly = r_lry - contours[i + nudge + 1] - 1
-
-            # find lrx, lry
-            if 'ligature' in nc[1]:
-                r_lrx = r_ulx + self.lig_width
-                r_lry = r_uly - contours[i + nudge + 1]
-                nudge += 1
-            else:
-                r_lrx = r_ulx + 1
-                r_lry = r_uly + 1
-
-            zone_pos.append([r_ulx, r_uly, r_lrx, r_lry])
-            # print(zone_pos)
-
-        return zone_pos
+        return neume_plans.find_zone_positions(nc_names, contours, self.lig_width)
 
     def _find_zone_edges(self, nc_names, contours):
-        # find boundaries of facs zone relative per glyph
-        # i.e. punctum/inclinatum gets 1x1, ligature2 gets 2x2
-
-        x_dim_max = sum((self.lig_width if 'ligature' in x[1] else 1) for x in nc_names)
-
-        y_dim_min = 0
-        y_dim_max = 0
-        flow = 0
-        for n in contours:
-            flow += n
-            if flow < y_dim_min:
-                y_dim_min = flow
-            if flow > y_dim_max:
-                y_dim_max = flow
-
-        return 0, x_dim_max, y_dim_min, y_dim_max + 1
+        return neume_plans.find_zone_edges(nc_names, contours, self.lig_width)
 
     def _shift_zone_pos_positive(self, zone_pos):
-        negative = True
-        while negative:
-            self._shift_zone_pos_by1(zone_pos)
-            if self._zone_pos_is_positive(zone_pos):
-                negative = False
-
-        return zone_pos
-
-    def _shift_zone_pos_by1(self, zone_pos):
-        for i, z in enumerate(zone_pos):
-            for j, num in enumerate(z):
-                if j == 1 or j == 3:
-                    zone_pos[i][j] += 1
+        return neume_plans.shift_zone_pos_positive(zone_pos)
 
     def _zone_pos_is_positive(self, zone_pos):
-        for z in zone_pos:
-            for num in [z[1], z[3]]:
-                if num < 0:
-                    return False
-        return True
+        return neume_plans.zone_pos_is_positive(zone_pos)
 
     ############################
     # Neume Grouping Utilities
@@ -534,41 +828,53 @@ class MeiOutput(object):
     def _process_glyphs(self, glyphs):
 
         # separate glyphs by type
-        neumes = list(filter(lambda g: g['glyph']['name'].split('.')[0] == 'neume', glyphs))
-        notNeumes = list(filter(lambda g: g['glyph']['name'].split('.')[0] != 'neume', glyphs))
+        neumes = []
+        notNeumes = []
+        for g in glyphs:
+            if g.category == 'neume':
+                neumes.append(g)
+            else:
+                notNeumes.append(g)
 
         # group neume componenets
         neumesGrouped = self._group_neumes(neumes, int(self.avg_punc_width * self.max_neume_spacing), self.max_group_size)
-        sortedGlyphs = []
-
-        while neumesGrouped or notNeumes:
-            # place the rest at the end
-            if not notNeumes:
-                sortedGlyphs.append(neumesGrouped[0])
-                del neumesGrouped[0]
-            elif not neumesGrouped:
-                sortedGlyphs.append([notNeumes[0]])
-                del notNeumes[0]
-
-            # place in order
-            elif notNeumes[0]['glyph']['bounding_box']['ulx'] <= neumesGrouped[0][0]['glyph']['bounding_box']['ulx']:
-                sortedGlyphs.append([notNeumes[0]])
-                del notNeumes[0]
-            else:
-                sortedGlyphs.append(neumesGrouped[0])
-                del neumesGrouped[0]
 
-        # print('\n\n')
-        # for group in sortedGlyphs:
-        #     for g in group:
-        #         print(g['glyph']['bounding_box']['ulx'], g['glyph']['name'])
+        # place in order
+        return grouping.interleave(neumesGrouped, notNeumes, lambda g: g.ulx)
+
+    def _process_rows(self, rows):
+        # _process_glyphs for the columnar store, grouping on array slices
+        store = self.glyph_store
+        if not len(rows):
+            return []
 
-        return sortedGlyphs
+        isNeume = store.category[rows] == store.code('neume')
+        neumeRows = rows[isNeume]
+        glyphs = list(zip(store.records(rows), isNeume.tolist()))
+
+        if self.group_ids is not None:
+            import vector_grouping
+            starts = vector_grouping.group_starts(self.group_ids[neumeRows])
+        else:
+            starts = grouping.group_starts(store.names(neumeRows), store.edges(neumeRows),
+                                           int(self.avg_punc_width * self.max_neume_spacing), self.max_group_size)
+        neumesGrouped = grouping.split_groups(list(g for (g, neume) in glyphs if neume), starts)
+        notNeumes = list(g for (g, neume) in glyphs if not neume)
+
+        return grouping.interleave(neumesGrouped, notNeumes, lambda g: g.ulx)
 
     def _group_neumes(self, neumes, max_distance, max_group_size):
         # input a horizontal staff of neumes
         # output grouped neume components
 
+        names = list(n.tokens for n in neumes)
+        starts = grouping.group_starts(names, self._get_edges(neumes), max_distance, max_group_size)
+
+        return grouping.split_groups(neumes, starts)
+
+    def _group_neumes_by_merging(self, neumes, max_distance, max_group_size):
+        # reference implementation of _group_neumes, merges in place
+
         groupedNeumes = list([n] for n in neumes)
         edges = self._get_edges(neumes)
 
@@ -581,7 +887,7 @@ class MeiOutput(object):
         return groupedNeumes
 
     def _get_edges(self, glyphs):
-        return list([g['glyph']['bounding_box']['ulx'], g['glyph']['bounding_box']['ulx'] + g['glyph']['bounding_box']['ncols']] for g in glyphs)
+        return list([g.ulx, g.ulx + g.ncols] for g in glyphs)
 
     def _get_edge_distance(self, edges):
         return list([e[0] - edges[i][1], edges[i + 2][0] - e[1]] for i, e in enumerate(edges[1: -1]))
@@ -605,8 +911,7 @@ class MeiOutput(object):
 
         nudge = 0
         for i in rangeArray:
-            n = neumeGroup[i - nudge][0]
-            name = n['glyph']['name'].split('.')
+            name = neumeGroup[i - nudge][0].tokens
 
             if direction == 'left'\
                     and condition in name[1]\
@@ -636,7 +941,7 @@ class MeiOutput(object):
         for ng in neumeGroups:
             print('')
             for n in ng:
-                print(n['glyph']['name'], n['pitch']['note'], n['pitch']['octave'])
+                print(n.name, n.note, n.octave)
 
 
 if __name__ == "__main__":
@@ -650,8 +955,7 @@ if __name__ == "__main__":
         print("incorrect usage\npython3 main.py (image/path)")
         quit()
 
-    with open(inJSOMR, 'r') as file:
-        jsomr = json.loads(file.read())
+    jsomr = jsomr_io.load(inJSOMR)
 
     kwargs = {
         'max_neume_spacing': 0.3,
@@ -665,4 +969,4 @@ if __name__ == "__main__":
         mei_obj.add_Image(image)
     mei_string = mei_obj.run()
 
-        print("ran")
+    print("ran")
@@ -1,8 +1,17 @@
 from rodan.jobs.base import RodanTask
 
-from gamera.core import Image
-from MeiOutput import MeiOutput
+from conversion_cache import ConversionCache
+import os
 import json
+import hashlib
+import jsomr_io
+
+
+def _log_cache_hit(logStats, key):
+    # stats were asked for, but the MEI was copied from the cache
+    if logStats:
+        from rodan.jobs.JSOMR2MEI import logger
+        logger.info('JSOMR2MEI stats: cache hit %s, nothing converted', key)
 
 
 class JSOMR2MEI(RodanTask):
@@ -20,6 +29,19 @@ class JSOMR2MEI(RodanTask):
                 'default': 'Neume Components',
                 'description': 'Specifies the naming, grouping, and spliting conventions used for glyph classification'
 
+            },
+            'Log Stats': {
+                'type': 'boolean',
+                'default': False,
+                'description': 'Writes stage timings, glyph counts and peak memory of the conversion to the job log, slowing it down. A cache hit is logged as such, as nothing is converted'
+            },
+            # no compressed profile: the MEI port is application/mei+xml text,
+            # gzipped output is left to batch.py and multi_page.py
+            'Output Profile': {
+                'enum': ['debug', 'compact'],
+                'type': 'string',
+                'default': 'debug',
+                'description': 'debug is indented with a comment per syllable, compact has no comments or whitespace. The MEI output is always uncompressed text'
             }
         }
     }
@@ -39,27 +61,115 @@ class JSOMR2MEI(RodanTask):
         'minimum': 1,
         'maximum': 1,
         'is_list': False
+    }, {
+        'name': 'Zone Index',
+        'resource_types': ['application/json'],
+        'minimum': 0,
+        'maximum': 1,
+        'is_list': False
     }]
 
     def run_my_task(self, inputs, settings, outputs):
 
-        with open(inputs['JSOMR'][0]['resource_path'], 'r') as file:
-            jsomr = json.loads(file.read())
-        print jsomr
-
         kwargs = {
             'version': '4.0.0',
 
             'max_neume_spacing': 0.3,
             'max_group_size': 8,
+            'output_profile': settings.get('Output Profile', 'debug'),
         }
 
-        # do job
-        mei_obj = MeiOutput(jsomr, **kwargs)
-        mei_string = mei_obj.run()
+        # a re-run with the same input and settings copies the stored MEI.
+        # the input is mapped, and may be gzip or zstd compressed or columnar
+        from rodan.jobs.JSOMR2MEI import __version__
+        cache = ConversionCache()
+        inPath = inputs['JSOMR'][0]['resource_path']
+        outfile_path = outputs['MEI'][0]['resource_path']
+        indexZones = 'Zone Index' in outputs     # only the MEI is cached
+        with jsomr_io.mapped(inPath) as data:
+            key = cache.key(data, kwargs, __version__)
+        logStats = settings.get('Log Stats', False)
+        if not indexZones and cache.copy_to(key, outfile_path):
+            _log_cache_hit(logStats, key)
+            return True
+        jsomr = jsomr_io.load(inPath)
+
+        # converting needs pymei, so only import it on a miss
+        from MeiOutput import MeiOutput
+
+        # do job, writing staves to the output as they are generated
+        mei_obj = MeiOutput(jsomr, low_memory=True, trace_memory=logStats, zone_index=indexZones, **kwargs)
+        del jsomr     # only mei_obj holds the page now
+
+        with open(outfile_path, "w") as outfile:
+            mei_obj.write(outfile)
+        cache.put_file(key, outfile_path)
+        if indexZones:
+            mei_obj.zone_index.save(outputs['Zone Index'][0]['resource_path'])
+        if logStats:
+            from rodan.jobs.JSOMR2MEI import logger
+            logger.info('JSOMR2MEI stats: %s', json.dumps(mei_obj.get_stats(), sort_keys=True))
+
+        return True
+
+
+class JSOMR2MEIMultiPage(RodanTask):
+    name = 'JSOMR pages to MEI'
+    author = 'Noah Baxter'
+    description = 'Generates one MEI file with a surface per page from a list of JSOMR files'
+    settings = JSOMR2MEI.settings
+    enabled = True
+    category = "Test"
+    interactive = False
+    input_port_types = [{
+        'name': 'JSOMR',
+        'resource_types': ['application/json'],
+        'minimum': 1,
+        'maximum': 1,
+        'is_list': True
+    }]
+    output_port_types = JSOMR2MEI.output_port_types[:1]
+
+    def run_my_task(self, inputs, settings, outputs):
 
+        # pages in list order, one resource_path per resource or a list of them
+        paths = []
+        for resource in inputs['JSOMR']:
+            if isinstance(resource['resource_path'], list):
+                paths.extend(resource['resource_path'])
+            else:
+                paths.append(resource['resource_path'])
+
+        kwargs = {
+            'version': '4.0.0',
+
+            'max_neume_spacing': 0.3,
+            'max_group_size': 8,
+            'output_profile': settings.get('Output Profile', 'debug'),
+        }
+
+        # the key covers every page, so reordering pages is a miss
+        from rodan.jobs.JSOMR2MEI import __version__
+        cache = ConversionCache()
+        digests = hashlib.sha256()
+        for path in paths:
+            with jsomr_io.mapped(path) as data:
+                digests.update(hashlib.sha256(data).digest())
+        key = cache.key(digests.digest(), dict(kwargs, pages=len(paths)), __version__)
         outfile_path = outputs['MEI'][0]['resource_path']
-        outfile = open(outfile_path, "w")
-        outfile.write(json.dumps(output_mei))
-        outfile.close()
+        logStats = settings.get('Log Stats', False)
+        if cache.copy_to(key, outfile_path):
+            _log_cache_hit(logStats, key)
+            return True
+
+        from multi_page import MultiPageOutput
+        book = MultiPageOutput(paths, workers=os.cpu_count(), stats=logStats, **kwargs)
+
+        with open(outfile_path, "w") as outfile:
+            book.write(outfile)
+        cache.put_file(key, outfile_path)
+        if logStats:
+            from rodan.jobs.JSOMR2MEI import logger
+            logger.info('JSOMR2MEI stats: %s', json.dumps(book.get_stats(), sort_keys=True))
+
         return True
@@ -0,0 +1,166 @@
+# converts many JSOMR files at once
+# python batch.py (dirs or globs) -o (output dir) [-j workers]
+
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import jsomr_io
+from MeiOutput import MeiOutput
+
+# per worker, set once by _init_worker
+_kwargs = None
+
+# picked up in directories, read whatever their extension says
+PATTERNS = ('*.json', '*.json.gz', '*.json.zst', '*.jsomrc')
+
+# compressed files are sized from their length instead of being
+# decompressed in the parent: gzipped cf18 is about 10 bytes a glyph
+COMPRESSED_BYTES_PER_GLYPH = 10
+
+
+def _init_worker(kwargs):
+    global _kwargs
+    _kwargs = kwargs
+
+
+def convert_file(path, outDir):
+    # returns (path, glyphs, seconds, error)
+    start = time.time()
+    glyphs = 0
+    outPath = output_path(path, outDir, _kwargs.get('output_profile'))
+    tmpPath = outPath + '.tmp'
+    try:
+        jsomr = jsomr_io.load(path)
+        glyphs = len(jsomr['glyph_store'] if 'glyph_store' in jsomr else jsomr['glyphs'])
+
+        mei_obj = MeiOutput(jsomr, **_kwargs)
+        with open(tmpPath, 'wb' if mei_obj.output_profile == 'compressed' else 'w') as out:
+            mei_obj.write(out)
+        if mei_obj.zone_index is not None:
+            mei_obj.zone_index.save(os.path.splitext(output_path(path, outDir))[0] + '.zones.json')
+        os.replace(tmpPath, outPath)
+    except Exception:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        return path, glyphs, time.time() - start, traceback.format_exc().strip().split('\n')[-1]
+
+    return path, glyphs, time.time() - start, None
+
+
+def output_path(path, outDir, profile=None):
+    extension = '.mei.gz' if profile == 'compressed' else '.mei'
+    name = re.sub(r'\.(gz|zst)$', '', os.path.basename(path))
+    return os.path.join(outDir, os.path.splitext(name)[0] + extension)
+
+
+def collect(inputs):
+    # JSOMR files named by directories or globs, largest first
+    paths = []
+    for i in inputs:
+        if os.path.isdir(i):
+            for pattern in PATTERNS:
+                paths.extend(sorted(glob.glob(os.path.join(i, pattern))))
+        else:
+            paths.extend(sorted(glob.glob(i)))
+
+    sizes = {}
+    for p in paths:
+        sizes[p] = estimate_glyphs(p)
+
+    return sorted(set(paths), key=lambda p: (-sizes[p], p))
+
+
+def estimate_glyphs(path):
+    # every glyph has one "glyph" object, counting them is cheaper than
+    # parsing. unreadable files count as 0, convert_file reports them
+    try:
+        with open(path, 'rb') as file:
+            kind = jsomr_io.detect(file.read(8))
+            if kind == 'json':
+                file.seek(0)
+                return file.read().count(b'"glyph"')
+        if kind == 'columnar':
+            import jsomr_columnar
+            with jsomr_io.mapped(path) as data:
+                return jsomr_columnar.header(data)[0]['rows']
+        return os.path.getsize(path) // COMPRESSED_BYTES_PER_GLYPH
+    except Exception:
+        return 0
+
+
+def convert_all(paths, outDir, kwargs, workers):
+    if workers <= 1:
+        _init_worker(kwargs)
+        return list(convert_file(p, outDir) for p in paths)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(kwargs,)) as pool:
+        futures = list(pool.submit(convert_file, p, outDir) for p in paths)
+        return list(f.result() for f in futures)
+
+
+def report(results, seconds, out=None):
+    out = out or sys.stdout
+    width = max([len(r[0]) for r in results] + [4])
+    out.write('%-*s %8s %10s  %s\n' % (width, 'file', 'glyphs', 'time (ms)', 'status'))
+    for (path, glyphs, took, error) in results:
+        out.write('%-*s %8d %10.1f  %s\n' % (width, path, glyphs, took * 1000, error or 'ok'))
+
+    done = list(r for r in results if r[3] is None)
+    glyphs = sum(r[1] for r in done)
+    seconds = max(seconds, 1e-6)
+    out.write('\n%d of %d pages in %.2f s: %.2f pages/s, %.0f glyphs/s\n' % (
+        len(done), len(results), seconds, len(done) / seconds, glyphs / seconds))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert JSOMR files to MEI.')
+    parser.add_argument('inputs', nargs='+', help='directories or globs of JSOMR files')
+    parser.add_argument('-o', '--output', required=True, help='output directory')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='processes, 1 for serial')
+    parser.add_argument('--version', default='4.0.0', help='MEI version')
+    parser.add_argument('--max-neume-spacing', type=float, default=0.3)
+    parser.add_argument('--max-group-size', type=int, default=8)
+    parser.add_argument('--ids', default='random', help='xml:id strategy, see idgen')
+    parser.add_argument('--low-memory', action='store_true', help='release staves once written, for large pages')
+    parser.add_argument('--share-zones', action='store_true', help='one <zone> for repeated boxes on a staff')
+    parser.add_argument('--zone-index', action='store_true', help='also write a <name>.zones.json spatial index')
+    parser.add_argument('--profile', default='debug', choices=MeiOutput.OUTPUT_PROFILES,
+                        help='debug is indented with comments, compact has neither, compressed is compact as .mei.gz')
+    parser.add_argument('--compress-level', type=int, default=6, help='gzip level of the compressed profile')
+    args = parser.parse_args(argv)
+
+    kwargs = {
+        'version': args.version,
+        'max_neume_spacing': args.max_neume_spacing,
+        'max_group_size': args.max_group_size,
+        'ids': args.ids,
+        'low_memory': args.low_memory,
+        'share_zones': args.share_zones,
+        'zone_index': args.zone_index,
+        'output_profile': args.profile,
+        'compress_level': args.compress_level,
+    }
+
+    paths = collect(args.inputs)
+    if not paths:
+        parser.error('no JSOMR files found')
+    outPaths = list(output_path(p, args.output) for p in paths)
+    if len(set(outPaths)) != len(outPaths):
+        parser.error('two inputs share a file name')
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    start = time.time()
+    results = convert_all(paths, args.output, kwargs, args.workers)
+    report(results, time.time() - start)
+
+    return 1 if any(r[3] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
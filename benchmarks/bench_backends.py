@@ -0,0 +1,46 @@
+# compares MeiOutput tree backends on one JSOMR page
+# python benchmarks/bench_backends.py (path/to/jsomr.json) (repeat)
+
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from MeiOutput import MeiOutput
+
+CF18 = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'cf18_res', 'classification', 'jsomr_output.json')
+
+
+def bench_backend(jsomr, backend, repeat):
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': backend,
+    }
+
+    try:
+        MeiOutput(jsomr, **kwargs).run()
+    except ImportError as e:
+        return None, str(e)
+
+    times = timeit.repeat(lambda: MeiOutput(jsomr, **kwargs).run(), number=1, repeat=repeat)
+    return min(times), sum(times) / len(times)
+
+
+if __name__ == "__main__":
+
+    inJSOMR = sys.argv[1] if len(sys.argv) > 1 else CF18
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with open(inJSOMR, 'r') as file:
+        jsomr = json.loads(file.read())
+
+    print('%-8s %10s %10s' % ('backend', 'min (ms)', 'mean (ms)'))
+    for backend in ['pymei', 'etree', 'lxml', 'stream']:
+        best, mean = bench_backend(jsomr, backend, repeat)
+        if best is None:
+            print('%-8s skipped (%s)' % (backend, mean))
+        else:
+            print('%-8s %10.2f %10.2f' % (backend, best * 1000, mean * 1000))
@@ -0,0 +1,48 @@
+# compares JSON backends loading one JSOMR page, see jsomr_io
+# python benchmarks/bench_json.py (path/to/jsomr.json) (repeat)
+
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import jsomr_io
+
+CF18 = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'cf18_res', 'classification', 'jsomr_output.json')
+
+
+def bench_read_text(path, repeat):
+    # what the loaders replaced: a text read and the stdlib decoder
+    def load():
+        with open(path, 'r') as file:
+            return json.loads(file.read())
+
+    times = timeit.repeat(load, number=1, repeat=repeat)
+    return min(times), sum(times) / len(times)
+
+
+def bench_decoder(path, backend, repeat):
+    try:
+        jsomr_io.get_decoder(backend)
+    except ImportError as e:
+        return None, str(e)
+
+    times = timeit.repeat(lambda: jsomr_io.load(path, backend), number=1, repeat=repeat)
+    return min(times), sum(times) / len(times)
+
+
+if __name__ == "__main__":
+
+    inJSOMR = sys.argv[1] if len(sys.argv) > 1 else CF18
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print('%-10s %10s %10s' % ('backend', 'min (ms)', 'mean (ms)'))
+    best, mean = bench_read_text(inJSOMR, repeat)
+    print('%-10s %10.2f %10.2f' % ('json text', best * 1000, mean * 1000))
+    for backend in jsomr_io.PREFERENCE:
+        best, mean = bench_decoder(inJSOMR, backend, repeat)
+        if best is None:
+            print('%-10s skipped (%s)' % (backend, mean))
+        else:
+            print('%-10s %10.2f %10.2f' % (backend, best * 1000, mean * 1000))
@@ -0,0 +1,208 @@
+# times each stage of MeiOutput on the cf18 page and on copies of it scaled
+# to more glyphs, and saves the results as JSON
+# python benchmarks/bench_pipeline.py [--scales 1,10,100] [--output results.json]
+
+import os
+import sys
+import copy
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import jsomr_io
+import tree_backends
+from MeiOutput import MeiOutput
+
+CF18 = os.path.join(ROOT, 'tests', 'cf18_res', 'classification', 'jsomr_output.json')
+
+KWARGS = {
+    'max_neume_spacing': 0.3,
+    'max_group_size': 8,
+    'version': '4.0.0',
+}
+
+
+#############
+# Fixtures
+#############
+
+def scale_page(jsomr, factor):
+    # factor copies of the page stacked vertically, each with its own staves
+    page = copy.deepcopy(jsomr)
+    height = jsomr['page']['bounding_box']['nrows']
+    numStaves = max(s['staff_no'] for s in jsomr['staves'])
+
+    page['page']['bounding_box']['nrows'] = height * factor
+    page['staves'] = []
+    page['glyphs'] = []
+    for k in range(factor):
+        for s in jsomr['staves']:
+            staff = copy.deepcopy(s)
+            staff['staff_no'] += k * numStaves
+            staff['bounding_box']['uly'] += k * height
+            page['staves'].append(staff)
+
+        for g in jsomr['glyphs']:
+            glyph = copy.deepcopy(g)
+            glyph['glyph']['bounding_box']['uly'] += k * height
+            if glyph['pitch']['staff'] != 'None':
+                glyph['pitch']['staff'] = str(int(glyph['pitch']['staff']) + k * numStaves)
+            page['glyphs'].append(glyph)
+
+    return page
+
+
+##########
+# Timing
+##########
+
+def best_of(fn, repeat, setup=None):
+    # setup runs before each timing, and its result is passed to fn
+    times = []
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+def bench_stages(text, backend, repeat):
+    # stage name -> (min, mean) seconds, each stage timed on its own
+    results = {}
+    jsomr = json.loads(text)
+    mei_obj = MeiOutput(jsomr, backend=backend, **KWARGS)
+    staves = list(s['staff_no'] for s in jsomr['staves'])
+    neumes = list(g for g in jsomr['glyphs'] if g['glyph']['name'].startswith('neume.'))
+
+    def build():
+        mei_obj.builder = tree_backends.get_builder(backend, mei_obj._new_ids())
+        return mei_obj._generate_mei()
+
+    root = build()
+
+    results['json_load'] = best_of(lambda: jsomr_io.loads(text), repeat)
+    results['index_glyphs'] = best_of(lambda: MeiOutput(jsomr, backend=backend, **KWARGS), repeat)
+    results['process_glyphs'] = best_of(lambda: list(mei_obj._process_glyphs(mei_obj.get_staff_glyphs(s)) for s in staves), repeat)
+    results['zonify'] = best_of(lambda: list(mei_obj._get_zonified_bounding_boxes(g) for g in neumes), repeat)
+    results['build_tree'] = best_of(build, repeat)
+    results['to_text'] = best_of(lambda: mei_obj.builder.to_text(root), repeat)
+    results['run'] = best_of(mei_obj.run, repeat)
+
+    return results
+
+
+########################
+# Micro Benchmarks
+########################
+
+def bench_new_pitch(repeat, calls=100000):
+    mei_obj = MeiOutput(jsomr_io.load(CF18), **KWARGS)
+    steps = [(('a', '3', 'c'), 'u', 2), (('c', '4', 'c'), 'd', 5), (('g', '2', 'f'), 'u', 7), (('b', '3', 'f'), 's', 1)]
+    loops = calls // len(steps)
+
+    def run():
+        for _ in range(loops):
+            for (startPitch, contour, interval) in steps:
+                mei_obj._get_new_pitch(startPitch, contour, interval)
+
+    return best_of(run, repeat), loops * len(steps)
+
+
+def bench_aomr_neume(repeat, calls=10000):
+    # AomrMeiOutput needs gamera and the old pymei bindings
+    try:
+        from AomrMeiOutput import AomrMeiOutput
+        import idgen
+    except ImportError as e:
+        return None, str(e)
+
+    aomr = AomrMeiOutput.__new__(AomrMeiOutput)
+    aomr._ids = idgen.get_ids('counter')
+    aomr.stats = None
+    aomr.layer = None
+    glyphs = [
+        {'type': 'neume', 'form': ['torculus', '2', '2'], 'strt_pitch': 'a', 'strt_pos': 5, 'octv': 3, 'clef_pos': 3, 'clef': 'clef.c', 'coord': [213, 179, 26, 35]},
+        {'type': 'neume', 'form': ['clivis', '3'], 'strt_pitch': 'f', 'strt_pos': 6, 'octv': 3, 'clef_pos': 2, 'clef': 'clef.f', 'coord': [300, 179, 26, 35]},
+        {'type': 'neume', 'form': ['punctum'], 'strt_pitch': 'c', 'strt_pos': 8, 'octv': 4, 'clef_pos': 3, 'clef': 'clef.c', 'coord': [360, 179, 16, 20]},
+    ]
+    loops = calls // len(glyphs)
+
+    # _create_neume_element changes the glyph, so every call gets a copy,
+    # made before the timer starts
+    def copies():
+        return list(copy.deepcopy(g) for _ in range(loops) for g in glyphs)
+
+    def run(copied):
+        for g in copied:
+            aomr.glyph = g
+            aomr._create_neume_element()
+
+    return best_of(run, repeat, copies), loops * len(glyphs)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the MeiOutput pipeline.')
+    parser.add_argument('--input', default=CF18, help='JSOMR page to scale')
+    parser.add_argument('--scales', default='1,10,100', help='glyph count multiples, e.g. 1,10,100,1000')
+    parser.add_argument('--backend', default='stream', help='tree backend, see tree_backends')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/pipeline-<time>.json)')
+    args = parser.parse_args(argv)
+
+    jsomr = jsomr_io.load(args.input)
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'json': jsomr_io.default_backend(),
+        'input': os.path.basename(args.input),
+        'stages': [],
+        'micro': [],
+    }
+
+    print('%6s %9s  %-15s %10s %10s' % ('scale', 'glyphs', 'stage', 'min (ms)', 'mean (ms)'))
+    for factor in list(int(f) for f in args.scales.split(',')):
+        page = scale_page(jsomr, factor) if factor > 1 else jsomr
+        text = json.dumps(page)
+        repeat = max(1, args.repeat // factor) if factor > 10 else args.repeat
+
+        for stage, (best, mean) in bench_stages(text, args.backend, repeat).items():
+            print('%6d %9d  %-15s %10.2f %10.2f' % (factor, len(page['glyphs']), stage, best * 1000, mean * 1000))
+            report['stages'].append({'scale': factor, 'glyphs': len(page['glyphs']), 'stage': stage,
+                                     'min_s': best, 'mean_s': mean, 'repeat': repeat})
+
+    print('\n%-15s %10s %10s' % ('micro', 'calls', 'ns/call'))
+    for name, bench in [('get_new_pitch', bench_new_pitch), ('aomr_neume', bench_aomr_neume)]:
+        timing, calls = bench(args.repeat)
+        if timing is None:
+            print('%-15s skipped (%s)' % (name, calls))
+            report['micro'].append({'name': name, 'skipped': calls})
+            continue
+        print('%-15s %10d %10.0f' % (name, calls, timing[0] / calls * 1e9))
+        report['micro'].append({'name': name, 'calls': calls, 'min_s': timing[0], 'mean_s': timing[1]})
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', 'pipeline-%s.json' % time.strftime('%Y%m%d-%H%M%S'))
+    if not os.path.isdir(os.path.dirname(os.path.abspath(output))):
+        os.makedirs(os.path.dirname(os.path.abspath(output)))
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print('\nsaved %s' % output)
+
+
+if __name__ == "__main__":
+    main()
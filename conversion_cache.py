@@ -0,0 +1,101 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+# On-disk cache of converted MEI.
+#
+# Entries are keyed by a hash of the JSOMR bytes, the MeiOutput kwargs and
+# the package version, and stored as <key>.mei in one directory. A hit
+# touches its entry, and eviction removes the least recently used entries
+# once the directory grows past max_bytes. Entries are written to a
+# temporary file and renamed into place, so readers never see half an entry.
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'jsomr2mei')
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+SUFFIX = '.mei'
+
+
+class ConversionCache(object):
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get('JSOMR2MEI_CACHE_DIR', DEFAULT_DIR)
+        self.max_bytes = max_bytes
+
+        os.makedirs(self.directory, exist_ok=True)     # jobs may start at the same time
+
+    def key(self, jsomr_bytes, kwargs, version):
+        h = hashlib.sha256()
+        h.update(json.dumps([kwargs, version], sort_keys=True).encode('utf-8'))
+        h.update(b'\0')
+        h.update(jsomr_bytes)
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        # path of the stored MEI, or None
+        path = self.path(key)
+        try:
+            os.utime(path, None)    # most recently used
+        except OSError:
+            return None
+        return path
+
+    def copy_to(self, key, dest):
+        path = self.get(key)
+        if path is None:
+            return False
+
+        try:
+            shutil.copyfile(path, dest)
+        except (IOError, OSError):
+            return False    # evicted since get
+        return True
+
+    def put(self, key, text):
+        self._store(key, lambda f: f.write(text.encode('utf-8') if not isinstance(text, bytes) else text))
+
+    def put_file(self, key, source):
+        # stores a copy of the MEI file at source
+        def copy(f):
+            with open(source, 'rb') as src:
+                shutil.copyfileobj(src, f)
+        self._store(key, copy)
+
+    def _store(self, key, write):
+        (fd, tmp) = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue    # removed by another process
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(e[1] for e in entries)
+        for (mtime, size, name) in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
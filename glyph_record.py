@@ -0,0 +1,84 @@
+import sys
+
+# Glyph records.
+#
+# One record per JSOMR glyph, built once when a page is loaded. The name is
+# split a single time and its tokens are shared by every glyph carrying it,
+# numbers are ints and JSOMR's "None" strings are real None.
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value):
+    if value is None or value == 'None':
+        return None
+    return sys.intern(value)
+
+
+class GlyphRecord(object):
+
+    __slots__ = ('name', 'tokens', 'category', 'subtype', 'bounding_box',
+                 'ulx', 'uly', 'ncols', 'nrows',
+                 'staff', 'note', 'octave', 'strt_pos', 'clef')
+
+    def __init__(self, name, tokens, bounding_box, staff, note, octave, strt_pos, clef):
+        self.name = name
+        self.tokens = tokens        # name split on '.', e.g. ('neume', 'punctum', 'u2', 'punctum')
+        self.category = tokens[0]
+        self.subtype = tokens[1] if len(tokens) > 1 else None
+
+        self.bounding_box = bounding_box
+        self.ulx = bounding_box['ulx']
+        self.uly = bounding_box['uly']
+        self.ncols = bounding_box['ncols']
+        self.nrows = bounding_box['nrows']
+
+        self.staff = staff
+        self.note = note
+        self.octave = octave
+        self.strt_pos = strt_pos
+        self.clef = clef
+
+    @classmethod
+    def from_glyphs(cls, glyphs):
+        names = {}      # name -> (interned name, shared tokens)
+
+        records = []
+        for g in glyphs:
+            name = g['glyph']['name']
+            if name not in names:
+                names[name] = (sys.intern(name), tuple(sys.intern(t) for t in name.split('.')))
+
+            p = g['pitch']
+            records.append(cls(names[name][0], names[name][1], g['glyph']['bounding_box'],
+                               to_int(p['staff']), _to_str(p['note']), to_int(p['octave']),
+                               to_int(p['strt_pos']), _to_str(p['clef'])))
+
+        return records
+
+    def key(self):
+        # the fields output depends on, as plain values
+        return (self.name, self.ulx, self.uly, self.ncols, self.nrows,
+                self.staff, self.note, self.octave, self.strt_pos, self.clef)
+
+    def _values(self):
+        return tuple(getattr(self, s) for s in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, GlyphRecord) and self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # key() holds every field __eq__ compares, bounding_box and tokens
+        # are made from them
+        return hash(self.key())
+
+    def __repr__(self):
+        return 'GlyphRecord(%s, staff=%s, ulx=%s)' % (self.name, self.staff, self.ulx)
@@ -0,0 +1,161 @@
+import numpy as np
+from glyph_record import GlyphRecord
+
+# Columnar glyph store.
+#
+# Built in one pass over incoming_data['glyphs']. Numbers are kept in fixed
+# width arrays with -1 for JSOMR's "None", strings (names, categories,
+# clefs) are interned into one table and stored as codes.
+
+NOTES = 'cdefgab'
+NOTE_CODES = dict((n, i) for i, n in enumerate(NOTES))
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class GlyphStore(object):
+
+    COLUMNS = (
+        ('ulx', np.int32),
+        ('uly', np.int32),
+        ('ncols', np.int32),
+        ('nrows', np.int32),
+        ('staff', np.int32),
+        ('note', np.int8),        # index into NOTES
+        ('octave', np.int8),
+        ('strt_pos', np.int8),
+        ('name', np.int32),       # codes into strings
+        ('category', np.int32),
+        ('clef', np.int32),
+    )
+
+    def __init__(self, columns, strings, source=None):
+        self.columns = columns
+        self.strings = strings
+        self.source = source    # columnar JSOMR file the columns are mapped from
+        self.codes = dict((s, i) for i, s in enumerate(strings))
+
+        for (column, dtype) in self.COLUMNS:
+            setattr(self, column, columns[column])
+
+    @classmethod
+    def from_glyphs(cls, glyphs):
+        n = len(glyphs)
+        columns = dict((column, np.empty(n, dtype)) for (column, dtype) in cls.COLUMNS)
+        codes = {}
+
+        def intern(string):
+            if string is None or string == 'None':
+                return -1
+            return codes.setdefault(string, len(codes))
+
+        ulx, uly, ncols, nrows = columns['ulx'], columns['uly'], columns['ncols'], columns['nrows']
+        staff, note, octave, strt_pos = columns['staff'], columns['note'], columns['octave'], columns['strt_pos']
+        name, category, clef = columns['name'], columns['category'], columns['clef']
+
+        for i, g in enumerate(glyphs):
+            bounding_box = g['glyph']['bounding_box']
+            pitch = g['pitch']
+            glyphName = g['glyph']['name']
+
+            ulx[i] = bounding_box['ulx']
+            uly[i] = bounding_box['uly']
+            ncols[i] = bounding_box['ncols']
+            nrows[i] = bounding_box['nrows']
+
+            staff[i] = _to_int(pitch['staff'])
+            note[i] = NOTE_CODES.get(pitch['note'], -1)
+            octave[i] = _to_int(pitch['octave'])
+            strt_pos[i] = _to_int(pitch['strt_pos'])
+
+            name[i] = intern(glyphName)
+            category[i] = intern(glyphName.partition('.')[0])
+            clef[i] = intern(pitch['clef'])
+
+        return cls(columns, sorted(codes, key=codes.get))
+
+    def __reduce__(self):
+        # a mapped store is pickled as its path, so pool workers map the
+        # same file instead of receiving a copy, see jsomr_columnar
+        if self.source is not None:
+            import jsomr_columnar
+            return (jsomr_columnar.load_store, (self.source,))
+        return (GlyphStore, (self.columns, self.strings))
+
+    def __len__(self):
+        return len(self.ulx)
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.columns.values())
+
+    ###########
+    # Strings
+    ###########
+
+    def code(self, string):
+        return self.codes.get(string, -1)
+
+    def string(self, code):
+        return self.strings[code] if code >= 0 else None
+
+    def tokens(self, codes):
+        # name codes split on '.', once per distinct name in codes. not kept
+        # on the store, a page can have close to a name per glyph
+        split = {}
+        for code in codes:
+            if code not in split:
+                split[code] = tuple(self.strings[code].split('.'))
+        return list(split[code] for code in codes)
+
+    ###########
+    # Queries
+    ###########
+
+    def staff_index(self):
+        # rows of every staff sorted by ulx, skip glyphs dropped
+        rows = np.flatnonzero(self.category != self.code('skip'))
+        rows = rows[np.lexsort((self.ulx[rows], self.staff[rows]))]
+
+        staves = self.staff[rows]
+        bounds = np.flatnonzero(staves[1:] != staves[:-1]) + 1
+        return dict((int(self.staff[r[0]]), r) for r in np.split(rows, bounds) if len(r))
+
+    def mean_width(self, name):
+        widths = self.ncols[self.name == self.code(name)]
+        return int(widths.sum()) / len(widths)
+
+    def names(self, rows):
+        return self.tokens(self.name[rows].tolist())
+
+    def edges(self, rows):
+        left = self.ulx[rows]
+        return np.column_stack((left, left + self.ncols[rows])).tolist()
+
+    def category_count(self, category):
+        return int((self.category == self.code(category)).sum())
+
+    def records(self, rows):
+        # a GlyphRecord per row, -1 read back as None. built for one staff at
+        # a time, as the generators read glyphs as records
+        def value(v):
+            return None if v < 0 else v
+
+        columns = list(self.columns[c][rows].tolist() for c in ('name', 'ulx', 'uly', 'ncols', 'nrows', 'staff', 'note', 'octave', 'strt_pos', 'clef'))
+        columns.insert(1, self.tokens(columns[0]))
+        return list(GlyphRecord(self.strings[name], tokens, {'nrows': nrows, 'ulx': ulx, 'uly': uly, 'ncols': ncols},
+                                value(staff), NOTES[note] if note >= 0 else None, value(octave), value(strt_pos), self.string(clef))
+                    for (name, tokens, ulx, uly, ncols, nrows, staff, note, octave, strt_pos, clef) in zip(*columns))
+
+    def bounding_box(self, row):
+        return {
+            'nrows': int(self.nrows[row]),
+            'ulx': int(self.ulx[row]),
+            'uly': int(self.uly[row]),
+            'ncols': int(self.ncols[row]),
+        }
@@ -0,0 +1,56 @@
+# Linear time neume grouping.
+#
+# Produces the same groups as the merge passes in MeiOutput (inclinatum
+# merges left, ligature merges right, then merge by spacing) but marks group
+# boundaries in a single sweep per pass instead of deleting from lists.
+
+
+def group_starts(names, edges, max_distance, max_group_size):
+    # names: split glyph name per neume, edges: [left, right] per neume
+    # returns the index of the first neume of every group
+    if not names:
+        return []
+
+    # an inclinatum joins the neume before it
+    starts = [i for i in range(len(names)) if i == 0 or 'inclinatum' not in names[i][1]]
+
+    # a group led by a ligature joins the group after it
+    starts = [s for j, s in enumerate(starts) if j == 0 or 'ligature' not in names[starts[j - 1]][-1]]
+
+    # merge by spacing, measured between the groups formed above. the first
+    # and last groups never merge left, and a group already at the size limit
+    # stays on its own
+    ends = starts[1:] + [len(names)]
+    merged = [starts[0]]
+    for k in range(1, len(starts) - 1):
+        gap = edges[starts[k]][0] - edges[ends[k - 1] - 1][1]
+        if gap < max_distance and ends[k] - starts[k] < max_group_size:
+            continue
+        merged.append(starts[k])
+    if len(starts) > 1:
+        merged.append(starts[-1])
+
+    return merged
+
+
+def split_groups(items, starts):
+    ends = starts[1:] + [len(items)]
+    return [items[s:e] for s, e in zip(starts, ends)]
+
+
+def interleave(groups, singles, position):
+    # merge two position sorted streams, singles first on ties
+    merged = []
+    i = j = 0
+    while i < len(groups) and j < len(singles):
+        if position(singles[j]) <= position(groups[i][0]):
+            merged.append([singles[j]])
+            j += 1
+        else:
+            merged.append(groups[i])
+            i += 1
+
+    merged.extend(groups[i:])
+    merged.extend([s] for s in singles[j:])
+
+    return merged
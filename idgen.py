@@ -0,0 +1,139 @@
+import uuid
+import hashlib
+
+# xml:id strategies.
+#
+# Every strategy has new_id(name, content, parent_id) and returns ids of the
+# form <prefix>-<suffix>:
+#   random   a uuid4 per element, as libmei does
+#   counter  a running number, short and reproducible
+#   hashed   a digest of the element name, its content (attributes other
+#            than references, or a glyph's position) and its parent's id;
+#            the same input gives the same ids even when elements are
+#            added or removed elsewhere
+#
+# Ids for a part of the document made elsewhere (e.g. a staff generated in
+# another process) come from fork(); the fork's state() is passed back to
+# adopt(), which advances this strategy past it and returns a function
+# mapping the fork's ids to the ids this strategy would have made, or None
+# if they already match.
+
+DEFAULT_PREFIX = 'm'
+
+
+class RandomIds(object):
+
+    def __init__(self, prefix=DEFAULT_PREFIX):
+        self.prefix = prefix
+
+    def new_id(self, name, content=None, parent_id=None):
+        return '%s-%s' % (self.prefix, uuid.uuid4())
+
+    def reserve(self, ids):
+        pass    # collisions are left to chance
+
+    def fork(self):
+        return self
+
+    def state(self):
+        return None
+
+    def adopt(self, state):
+        return None
+
+
+class CounterIds(object):
+
+    def __init__(self, prefix=DEFAULT_PREFIX):
+        self.prefix = prefix
+        self._count = 0
+
+    def new_id(self, name, content=None, parent_id=None):
+        self._count += 1
+        return '%s-%d' % (self.prefix, self._count)
+
+    def fork(self):
+        return CounterIds(self.prefix)
+
+    def state(self):
+        return self._count
+
+    def adopt(self, state):
+        offset = self._count
+        self._count += state
+        if not offset:
+            return None
+
+        start = len(self.prefix) + 1
+        return lambda i: '%s-%d' % (self.prefix, int(i[start:]) + offset)
+
+
+class HashedIds(object):
+
+    DIGEST_SIZE = 6     # bytes, 12 hex characters
+
+    # attributes holding other elements' ids are left out, so renumbering a
+    # zone doesn't change the ids of the elements pointing at it
+    REFERENCES = ('facs',)
+
+    def __init__(self, prefix=DEFAULT_PREFIX):
+        self.prefix = prefix
+        self._seen = {}
+
+    def new_id(self, name, content=None, parent_id=None):
+        if isinstance(content, dict):
+            content = sorted((a, v) for (a, v) in content.items() if a not in self.REFERENCES)
+        key = repr((parent_id, name, content)).encode('utf-8')
+        digest = hashlib.blake2b(key, digest_size=self.DIGEST_SIZE).hexdigest()
+
+        # identical elements under one parent, e.g. both zones of a ligature,
+        # are told apart by the order they were made in
+        n = self._seen.get(digest, 0)
+        self._seen[digest] = n + 1
+        if n:
+            return '%s-%s-%d' % (self.prefix, digest, n)
+        return '%s-%s' % (self.prefix, digest)
+
+    def reserve(self, ids):
+        # count ids made by an earlier run, so new ones don't repeat them
+        for i in ids:
+            parts = i[len(self.prefix) + 1:].split('-')
+            n = int(parts[1]) + 1 if len(parts) > 1 else 1
+            self._seen[parts[0]] = max(self._seen.get(parts[0], 0), n)
+
+    def fork(self):
+        return HashedIds(self.prefix)
+
+    def state(self):
+        return self._seen
+
+    def adopt(self, state):
+        # only digests made on both sides need renumbering
+        offsets = dict((digest, self._seen[digest]) for digest in state if digest in self._seen)
+        for (digest, n) in state.items():
+            self._seen[digest] = self._seen.get(digest, 0) + n
+        if not offsets:
+            return None
+
+        start = len(self.prefix) + 1
+
+        def remap(i):
+            parts = i[start:].split('-')
+            if parts[0] not in offsets:
+                return i
+            return '%s-%s-%d' % (self.prefix, parts[0], offsets[parts[0]] + (int(parts[1]) if len(parts) > 1 else 0))
+
+        return remap
+
+
+STRATEGIES = {
+    'random': RandomIds,
+    'counter': CounterIds,
+    'hashed': HashedIds,
+}
+
+
+def get_ids(strategy='random', prefix=DEFAULT_PREFIX):
+    if strategy not in STRATEGIES:
+        raise ValueError('unknown id strategy: %s' % strategy)
+    return STRATEGIES[strategy](prefix)
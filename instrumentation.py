@@ -0,0 +1,144 @@
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+# Stage timers, counters and profiler hooks for a conversion.
+#
+# Converters keep a Stats in self.stats, or None when instrumentation is off,
+# so the only cost of turning it off is an `is not None` check. Stages nest
+# and time is charged to the innermost one, e.g. grouping inside build is
+# counted as group and not as build.
+
+PROFILERS = ('cprofile', 'tracemalloc')
+DEFAULT_PROFILE_PATHS = {
+    'cprofile': 'jsomr2mei.prof',
+    'tracemalloc': 'jsomr2mei-tracemalloc.txt',
+}
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_TOP = 50
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self.memory = {}
+        self._stack = []
+        self._since = None
+
+    def push(self, stage):
+        now = time.perf_counter()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        self._stack.append(stage)
+        self._since = now
+
+    def pop(self):
+        now = time.perf_counter()
+        self._charge(self._stack.pop(), now)
+        self._since = now
+
+    @contextmanager
+    def stage(self, stage):
+        self.push(stage)
+        try:
+            yield
+        finally:
+            self.pop()
+
+    def timed(self, stage, fn):
+        # fn, with its calls charged to stage
+        def wrapper(*args):
+            self.push(stage)
+            try:
+                return fn(*args)
+            finally:
+                self.pop()
+        return wrapper
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, counters):
+        for (name, n) in counters.items():
+            self.count(name, n)
+
+    def as_dict(self):
+        return {
+            'timings': dict(self.timings),
+            'counters': dict(self.counters),
+            'memory': dict(self.memory),
+        }
+
+    def _charge(self, stage, now):
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._since
+
+
+def get_stats(enabled):
+    return Stats() if enabled else None
+
+
+def check_profiler(kind):
+    if kind is not None and kind not in PROFILERS:
+        raise ValueError('unknown profiler: %s' % kind)
+
+
+@contextmanager
+def traced_memory(stats):
+    # records the peak and final memory traced during the block, in bytes
+    if stats is None:
+        yield
+        return
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        (current, peak) = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        stats.memory['peak_bytes'] = max(stats.memory.get('peak_bytes', 0), peak)
+        stats.memory['current_bytes'] = current
+
+
+@contextmanager
+def profiled(kind, path=None):
+    # runs the block under cProfile or tracemalloc and dumps the result to
+    # path: pstats data for cprofile, the top allocation sites as text for
+    # tracemalloc
+    check_profiler(kind)
+    if kind is None:
+        yield
+        return
+
+    path = path or DEFAULT_PROFILE_PATHS[kind]
+    if kind == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
+        return
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        (current, peak) = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        with open(path, 'w') as file:
+            file.write('current %d bytes, peak %d bytes\n\n' % (current, peak))
+            for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                file.write('%s\n' % stat)
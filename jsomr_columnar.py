@@ -0,0 +1,129 @@
+# python jsomr_columnar.py (JSOMR files) [-o output dir]
+
+import os
+import sys
+import json
+import struct
+import argparse
+import numpy as np
+import jsomr_io
+from glyph_store import GlyphStore
+
+# Binary columnar JSOMR.
+#
+# A page converted once with save() is reloaded by mapping the file: the
+# GlyphStore columns are numpy views straight into the mapping, so nothing
+# is parsed and processes converting the same page share it through the OS
+# page cache. The layout is
+#
+#   MAGIC, header length (uint32, little endian), header JSON, padding,
+#   the GlyphStore columns, each 8-byte aligned
+#
+# and the header has the string table, the page and staves of the JSOMR,
+# and every column's dtype and offset from the end of the padding.
+#
+# load() returns {'page', 'staves', 'glyph_store'}, which MeiOutput takes in
+# place of the JSOMR dict. jsomr_io.load recognizes the file by its magic.
+
+MAGIC = b'JSOMRCOL'
+VERSION = 1
+SUFFIX = '.jsomrc'
+ALIGN = 8
+
+_prefix = struct.Struct('<8sI')
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def save(jsomr, path):
+    store = GlyphStore.from_glyphs(jsomr['glyphs'])
+
+    columns = []
+    offset = 0
+    for (column, dtype) in GlyphStore.COLUMNS:
+        array = store.columns[column]
+        columns.append([column, array.dtype.newbyteorder('<').str, offset])
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'version': VERSION,
+        'rows': len(store),
+        'strings': store.strings,
+        'page': jsomr['page'],
+        'staves': jsomr['staves'],
+        'columns': columns,
+    }, separators=(',', ':')).encode('utf-8')
+
+    with open(path, 'wb') as file:
+        file.write(_prefix.pack(MAGIC, len(header)))
+        file.write(header)
+        file.write(b'\0' * (_aligned(file.tell()) - file.tell()))
+        start = file.tell()
+        for (column, dtype, offset) in columns:
+            file.write(b'\0' * (start + offset - file.tell()))
+            file.write(store.columns[column].astype(dtype, copy=False).tobytes())
+
+
+def header(data):
+    # (header dict, offset of the columns) of a file's bytes
+    (magic, length) = _prefix.unpack(bytes(data[:_prefix.size]))
+    if magic != MAGIC:
+        raise ValueError('not a columnar JSOMR file')
+
+    head = json.loads(bytes(data[_prefix.size:_prefix.size + length]).decode('utf-8'))
+    if head.get('version') != VERSION:
+        raise ValueError('unknown columnar JSOMR version: %s' % head.get('version'))
+    return head, _aligned(_prefix.size + length)
+
+
+def from_buffer(data, source=None):
+    # the page over data, a buffer that must outlive it. source is the
+    # file's path, so the store can be pickled as one
+    buffer = np.frombuffer(data, np.uint8) if not isinstance(data, np.ndarray) else data
+    (head, start) = header(buffer)
+
+    columns = {}
+    for (column, dtype, offset) in head['columns']:
+        dtype = np.dtype(dtype)
+        begin = start + offset
+        columns[column] = buffer[begin:begin + head['rows'] * dtype.itemsize].view(dtype)
+
+    return {
+        'page': head['page'],
+        'staves': head['staves'],
+        'glyph_store': GlyphStore(columns, head['strings'], source=source),
+    }
+
+
+def load(path):
+    return from_buffer(np.memmap(path, np.uint8, mode='r'), source=os.path.abspath(path))
+
+
+def load_store(path):
+    return load(path)['glyph_store']
+
+
+def output_path(path, outDir=None):
+    name = os.path.basename(path)
+    for extension in ('.gz', '.zst', '.json'):
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    return os.path.join(outDir or os.path.dirname(path), name + SUFFIX)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert JSOMR files to the binary columnar format.')
+    parser.add_argument('inputs', nargs='+', help='JSOMR files, plain or compressed')
+    parser.add_argument('-o', '--output', help='output directory, next to each input by default')
+    args = parser.parse_args(argv)
+
+    if args.output and not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    for path in args.inputs:
+        save(jsomr_io.load(path), output_path(path, args.output))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
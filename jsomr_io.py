@@ -0,0 +1,161 @@
+import os
+import json
+import gzip
+import mmap
+from contextlib import contextmanager
+
+# JSOMR loading.
+#
+# Files are read as bytes and decoded by the fastest JSON library installed:
+# orjson, then ujson, then the standard library. All of them give the same
+# dicts, lists, strings and numbers, so MeiOutput doesn't care which ran.
+#
+# gzip or zstd compressed files, told apart by their magic bytes, are
+# decompressed in memory. JSON files of MAP_MIN_SIZE or more are
+# memory-mapped rather than read: orjson parses the mapping without a copy
+# of the file, but more slowly than bytes, so smaller files are read. The
+# other decoders only take bytes and get a copy either way.
+#
+# Binary columnar files, see jsomr_columnar, are recognized too and loaded
+# as {'page', 'staves', 'glyph_store'} instead of the JSOMR dict.
+
+PREFERENCE = ('orjson', 'ujson', 'json')
+BUFFER_BACKENDS = ('orjson',)   # decoders that take any buffer, e.g. an mmap
+MAP_MIN_SIZE = 64 * 1024 ** 2
+
+MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+    b'JSOMRCOL': 'columnar',
+}
+
+_default = None
+
+
+def _orjson():
+    import orjson
+    return orjson.loads
+
+
+def _ujson():
+    import ujson
+    return ujson.loads
+
+
+def _json():
+    return json.loads   # takes bytes since python 3.6
+
+
+DECODERS = {
+    'orjson': _orjson,
+    'ujson': _ujson,
+    'json': _json,
+}
+
+
+def get_decoder(backend=None):
+    # loads function of backend, or of the first installed one
+    backend = backend or default_backend()
+    if backend not in DECODERS:
+        raise ValueError('unknown JSON backend: %s' % backend)
+    return DECODERS[backend]()
+
+
+def default_backend():
+    global _default
+    if _default is None:
+        _default = available()[0]
+    return _default
+
+
+def available():
+    names = []
+    for name in PREFERENCE:
+        try:
+            DECODERS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def detect(data):
+    # 'gzip', 'zstd', 'columnar' or 'json', from the first bytes of a file
+    head = bytes(data[:8])
+    for (magic, kind) in MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return 'json'
+
+
+def decompress(data):
+    # the JSON bytes of data, which is returned as is when not compressed
+    kind = detect(data)
+    if kind == 'gzip':
+        return gzip.decompress(data)
+    if kind == 'zstd':
+        return _zstd_decompress(data)
+    return data
+
+
+def _zstd_decompress(data):
+    try:
+        from compression import zstd    # python 3.14
+        return zstd.decompress(data)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('reading zstd compressed JSOMR needs the zstandard package')
+    # a decompressobj doesn't need the content size in the frame header
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+@contextmanager
+def mapped(path):
+    # the file's bytes as a read-only mmap, or bytes when it's empty, which
+    # can't be mapped. only valid inside the with block
+    with open(path, 'rb') as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield file.read()
+            return
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def loads(data, backend=None):
+    # data is text, or bytes or a buffer that may be compressed
+    backend = backend or default_backend()
+    decoder = get_decoder(backend)
+    if isinstance(data, str):
+        return decoder(data)
+    if detect(data) == 'columnar':
+        import jsomr_columnar
+        return jsomr_columnar.from_buffer(data if isinstance(data, bytes) else bytes(data))
+
+    data = decompress(data)
+    if isinstance(data, bytes):
+        return decoder(data)    # faster than a view of it
+    if backend in BUFFER_BACKENDS:
+        with memoryview(data) as view:
+            return decoder(view)
+    return decoder(bytes(data))
+
+
+def load(path, backend=None):
+    with open(path, 'rb') as file:
+        kind = detect(file.read(8))
+        if kind == 'columnar':
+            import jsomr_columnar
+            return jsomr_columnar.load(path)   # mapped for as long as the page is used
+        if kind != 'json' or os.fstat(file.fileno()).st_size < MAP_MIN_SIZE:
+            file.seek(0)
+            return loads(file.read(), backend)
+
+    with mapped(path) as data:
+        return loads(data, backend)
@@ -0,0 +1,196 @@
+import io
+import gzip
+import idgen
+import shutil
+import tempfile
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+
+# Streaming MEI output.
+#
+# Elements are described as events, ('start', name, attributes), ('end', name)
+# and ('comment', text), and written as they arrive in the same layout as
+# pymei's documentToText: tab indentation, xml:id first, ' />' for elements
+# without children. An empty indent and newline give compact output.
+
+START = 'start'
+END = 'end'
+COMMENT = 'comment'
+RAW = 'raw'     # already serialized text, passed in as a file object
+
+MEI_NS = 'http://www.music-encoding.org/ns/mei'
+
+
+class StreamElement(object):
+
+    __slots__ = ('name', 'id', 'attributes', 'children', 'value')
+
+    def __init__(self, name, attributes=None, id=None):
+        self.name = name
+        self.id = id
+        self.attributes = list(attributes.items()) if attributes else []
+        self.children = []
+        self.value = None
+
+    def addChild(self, child):
+        self.children.append(child)
+
+
+class StreamBuilder(object):
+    # tree backend for streaming, see tree_backends
+
+    def __init__(self, ids=None):
+        self.ids = ids or idgen.RandomIds()
+
+    def element(self, parent, name, attributes=None):
+        el = StreamElement(name, attributes, self.ids.new_id(name, attributes, parent.id if parent is not None else None))
+        if parent is not None:
+            parent.addChild(el)
+        return el
+
+    def comment(self, parent, text):
+        el = StreamElement('_comment')
+        el.value = text
+        parent.addChild(el)
+
+    def get_id(self, el):
+        return el.id
+
+    def to_text(self, root):
+        out = io.StringIO()
+        writer = MeiStreamWriter(out)
+        writer.write_declaration()
+        writer.write_events(document_events(root))
+        return out.getvalue()
+
+
+class ZoneBuffer(object):
+    # takes the place of <surface> while staves are generated, keeps zones
+    # as (id, ulx, uly, lrx, lry) tuples
+
+    def __init__(self, id=None):
+        self.id = id    # of the surface, parent of the zones
+        self.zones = []
+
+    def addChild(self, zone):
+        a = dict(zone.attributes)
+        self.zones.append((zone.id, a['ulx'], a['uly'], a['lrx'], a['lry']))
+
+    def events(self):
+        for (zoneId, ulx, uly, lrx, lry) in self.zones:
+            yield (START, 'zone', [('xml:id', zoneId), ('ulx', ulx), ('uly', uly), ('lrx', lrx), ('lry', lry)])
+            yield (END, 'zone')
+
+    def close(self):
+        pass
+
+
+class SpooledZoneBuffer(object):
+    # a ZoneBuffer for low-memory runs, writes each zone as it arrives and
+    # keeps the text in a file that spills to disk past max_size
+
+    def __init__(self, id=None, depth=0, max_size=4 * 1024 ** 2, indent='\t', newline='\n'):
+        self.id = id
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+')
+        self._writer = MeiStreamWriter(self.file, depth, indent, newline)
+
+    def addChild(self, zone):
+        self._writer.write((START, 'zone', [('xml:id', zone.id)] + zone.attributes))
+        self._writer.write((END, 'zone'))
+
+    def events(self):
+        if self.file.tell():
+            yield (RAW, self.file)
+
+    def close(self):
+        self.file.close()
+
+
+def comment_text(text):
+    # XML comments can't hold '--' or end in '-'
+    text = text.replace('--', '- -')
+    return text + ' ' if text.endswith('-') else text
+
+
+def element_events(el):
+    if el.name == '_comment':
+        yield (COMMENT, el.value)
+        return
+
+    yield (START, el.name, [('xml:id', el.id)] + el.attributes)
+    for child in el.children:
+        for event in element_events(child):
+            yield event
+    yield (END, el.name)
+
+
+def document_events(root):
+    # element events with the namespace declared on the root
+    events = element_events(root)
+    (kind, name, attributes) = next(events)
+    yield (kind, name, attributes[:1] + [('xmlns', MEI_NS)] + attributes[1:])
+
+    for event in events:
+        yield event
+
+
+@contextmanager
+def gzip_text(fileobj, level):
+    # a text file writing gzip to the binary fileobj; mtime 0 keeps the
+    # output the same for the same document
+    gz = gzip.GzipFile(filename='', fileobj=fileobj, mode='wb', compresslevel=level, mtime=0)
+    text = io.TextIOWrapper(gz, encoding='utf-8')
+    try:
+        yield text
+    finally:
+        text.close()    # closes gz too, which leaves fileobj open
+
+
+class MeiStreamWriter(object):
+
+    def __init__(self, fileobj, depth=0, indent='\t', newline='\n'):
+        self.fileobj = fileobj
+        self.depth = depth
+        self.indent = indent
+        self.newline = newline
+        self._pending = None    # start tag waiting to see if the element is empty
+
+    def write_declaration(self):
+        self.fileobj.write('<?xml version="1.0" encoding="UTF-8"?>' + self.newline)
+
+    def write_events(self, events):
+        for event in events:
+            self.write(event)
+
+    def write(self, event):
+        kind = event[0]
+
+        if self._pending:
+            if kind == END:
+                self._line(self._tag(self._pending) + ' />')
+                self._pending = None
+                return
+            self._open_pending()
+
+        if kind == START:
+            self._pending = event
+        elif kind == END:
+            self.depth -= 1
+            self._line('</%s>' % event[1])
+        elif kind == COMMENT:
+            self._line('<!--%s-->' % comment_text(event[1]))
+        elif kind == RAW:
+            event[1].seek(0)
+            shutil.copyfileobj(event[1], self.fileobj)
+
+    def _open_pending(self):
+        self._line(self._tag(self._pending) + '>')
+        self.depth += 1
+        self._pending = None
+
+    def _tag(self, event):
+        attributes = ''.join(' %s="%s"' % (a, escape(str(v), {'"': '&quot;'})) for a, v in event[2])
+        return '<' + event[1] + attributes
+
+    def _line(self, text):
+        self.fileobj.write(self.indent * self.depth + text + self.newline)
@@ -0,0 +1,172 @@
+# python multi_page.py (JSOMR pages, in order) -o (output) [-j workers]
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import idgen
+import instrumentation
+import jsomr_io
+from MeiOutput import MeiOutput
+from mei_writer import StreamBuilder, MeiStreamWriter, document_events, gzip_text, END, RAW
+
+# One MEI document from many JSOMR pages.
+#
+# Every page is converted on its own, in a process pool, with MeiOutput's
+# write_page: its <surface> and its <pb /> and staves are written to two
+# files in a scratch directory. The document is the skeleton with the
+# surfaces copied into <facsimile> and the page breaks and staves into
+# <section>, in page order. Page n's ids get the prefix <prefix>-p<n>, so
+# they are unique across pages without renumbering.
+
+
+def convert_page(n, path, directory, kwargs):
+    # returns (n, lines of the first staff, counters)
+    jsomr = jsomr_io.load(path)
+    lines = jsomr['staves'][0]['num_lines'] if jsomr['staves'] else None
+    pageKwargs = dict(kwargs, id_prefix='%s-p%d' % (kwargs.get('id_prefix', idgen.DEFAULT_PREFIX), n), low_memory=True)
+    if pageKwargs.get('output_profile') == 'compressed':
+        pageKwargs['output_profile'] = 'compact'     # the document is compressed once, see MultiPageOutput.write
+    mei_obj = MeiOutput(jsomr, **pageKwargs)
+    del jsomr
+
+    (surfacePath, sectionPath) = page_paths(directory, n)
+    with open(surfacePath, 'w') as surfaceFile, open(sectionPath, 'w') as sectionFile:
+        mei_obj.write_page(surfaceFile, sectionFile, n)
+
+    stats = mei_obj.get_stats()
+    return n, lines, stats['counters'] if stats else None
+
+
+def page_paths(directory, n):
+    return os.path.join(directory, '%d.surface' % n), os.path.join(directory, '%d.section' % n)
+
+
+class MultiPageOutput(object):
+
+    def __init__(self, paths, **kwargs):
+        # paths of the JSOMR pages, in page order. kwargs are MeiOutput's,
+        # plus workers for the number of pages converted at once
+        self.paths = list(paths)
+        self.kwargs = dict(kwargs)
+        self.workers = self.kwargs.pop('workers', 1)
+        self.version = kwargs['version']
+        self.id_strategy = kwargs.get('ids', 'random')
+        self.id_prefix = kwargs.get('id_prefix', idgen.DEFAULT_PREFIX)
+        self.stats = instrumentation.get_stats(kwargs.get('stats'))
+        self.output_profile = kwargs.get('output_profile', 'debug')
+        self.compress_level = kwargs.get('compress_level', 6)
+
+        if not self.paths:
+            raise ValueError('a document needs at least one page')
+        if self.output_profile not in MeiOutput.OUTPUT_PROFILES:
+            raise ValueError('unknown output profile: %s' % self.output_profile)
+
+    def run(self):
+        # text, or gzipped bytes for the compressed profile
+        binary = self.output_profile == 'compressed'
+        (fd, path) = tempfile.mkstemp(suffix='.mei')
+        try:
+            with os.fdopen(fd, 'wb' if binary else 'w') as out:
+                self.write(out)
+            with open(path, 'rb' if binary else 'r') as file:
+                return file.read()
+        finally:
+            os.remove(path)
+
+    def write(self, fileobj):
+        # fileobj is binary for the compressed profile
+        if self.output_profile == 'compressed':
+            with gzip_text(fileobj, self.compress_level) as text:
+                self._write(text)
+        else:
+            self._write(fileobj)
+
+    def _write(self, fileobj):
+        directory = tempfile.mkdtemp(prefix='jsomr2mei-')
+        try:
+            results = self._convert_pages(directory)
+            lines = next((r[1] for r in results if r[1] is not None), None)
+            for (n, pageLines, counters) in results:
+                if counters and self.stats is not None:
+                    self.stats.merge(counters)
+
+            # pages are written in the same layout by convert_page
+            if self.output_profile == 'debug':
+                writer = MeiStreamWriter(fileobj)
+            else:
+                writer = MeiStreamWriter(fileobj, indent='', newline='')
+            writer.write_declaration()
+            writer.write_events(self._document_events(self._generate_skeleton(lines), directory))
+        finally:
+            shutil.rmtree(directory)
+
+    def get_stats(self):
+        if self.stats is None:
+            return None
+        return self.stats.as_dict()
+
+    def _convert_pages(self, directory):
+        pages = list(range(1, len(self.paths) + 1))
+        if self.workers <= 1 or len(self.paths) < 2:
+            return list(convert_page(n, p, directory, self.kwargs) for (n, p) in zip(pages, self.paths))
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(convert_page, pages, self.paths, [directory] * len(pages), [self.kwargs] * len(pages)))
+
+    def _generate_skeleton(self, lines):
+        # MeiOutput's document without the surfaces and staves
+        builder = StreamBuilder(idgen.get_ids(self.id_strategy, self.id_prefix))
+        mei = builder.element(None, "mei", {'meiversion': self.version})
+        builder.element(mei, "meiHead")
+        music = builder.element(mei, "music")
+        builder.element(music, "facsimile")
+        body = builder.element(music, "body")
+        mdiv = builder.element(body, "mdiv")
+        score = builder.element(mdiv, "score")
+        scoreDef = builder.element(score, "scoreDef")
+        staffGrp = builder.element(scoreDef, "staffGrp")
+        builder.element(staffGrp, "staffDef", {
+            'n': '1',
+            'lines': str(lines),
+            'notationtype': 'neume',
+        })
+        builder.element(score, "section")
+
+        return mei
+
+    def _document_events(self, skeleton, directory):
+        for event in document_events(skeleton):
+            if event[0] == END and event[1] in ('facsimile', 'section'):
+                for n in range(1, len(self.paths) + 1):
+                    path = page_paths(directory, n)[0 if event[1] == 'facsimile' else 1]
+                    with open(path, 'r') as file:
+                        yield (RAW, file)
+            yield event
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert JSOMR pages to one MEI document.')
+    parser.add_argument('pages', nargs='+', help='JSOMR files, in page order')
+    parser.add_argument('-o', '--output', required=True, help='MEI path')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='processes, 1 for serial')
+    parser.add_argument('--version', default='4.0.0', help='MEI version')
+    parser.add_argument('--max-neume-spacing', type=float, default=0.3)
+    parser.add_argument('--max-group-size', type=int, default=8)
+    parser.add_argument('--ids', default='random', help='xml:id strategy, see idgen')
+    parser.add_argument('--profile', default='debug', choices=MeiOutput.OUTPUT_PROFILES,
+                        help='debug is indented with comments, compact has neither, compressed is gzipped compact')
+    parser.add_argument('--compress-level', type=int, default=6, help='gzip level of the compressed profile')
+    args = parser.parse_args(argv)
+
+    book = MultiPageOutput(args.pages, workers=args.workers, version=args.version, ids=args.ids,
+                           max_neume_spacing=args.max_neume_spacing, max_group_size=args.max_group_size,
+                           output_profile=args.profile, compress_level=args.compress_level)
+    with open(args.output, 'wb' if args.profile == 'compressed' else 'w') as out:
+        book.write(out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
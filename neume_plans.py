@@ -0,0 +1,175 @@
+from functools import lru_cache
+import pitch
+
+# Compiled neume plans.
+#
+# Everything about the ncs of a glyph except its bounding box and start pitch
+# follows from its name, e.g. neume.punctum.u2.ligature3.d2.inclinatum. A
+# plan is compiled once per name and applied to each glyph carrying it.
+
+PLAN_CACHE_SIZE = 1024
+
+
+class NeumePlan(object):
+    __slots__ = ('ncs', 'offsets', 'zones', 'x_dim', 'y_dim')
+
+    def __init__(self, ncs, zones, x_dim, y_dim):
+        self.ncs = ncs          # (primitive, step) per nc, step is (contour, interval) or None
+        self.offsets = nc_offsets(ncs)
+        self.zones = zones      # relative (ulx, uly, lrx, lry) per nc, None if singular
+        self.x_dim = x_dim
+        self.y_dim = y_dim
+
+    def place(self, glyph_bounding):
+        # scale relative zones to the glyph's bounding box
+        if self.zones is None:
+            return [glyph_bounding]
+
+        x_dim, y_dim = self.x_dim, self.y_dim      # x_dim relates to ncols, y_dim relates to nrows
+        ncols = glyph_bounding['ncols']
+        nrows = glyph_bounding['nrows']
+        ulx = glyph_bounding['ulx']
+        uly = glyph_bounding['uly']
+
+        return list({
+            'nrows': int(nrows * (z[3] - z[1]) / y_dim),
+            'ulx': int(ncols * (z[0] / x_dim)) + ulx,
+            'uly': int(nrows * (z[1] / y_dim)) + uly,
+            'ncols': int(ncols * (z[2] - z[0]) / x_dim),
+        } for z in self.zones)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_plan(name, lig_width):
+    name = name.split('.')
+
+    # first nc starts at the glyph pitch, every following one is a step away
+    ncs = [(name[1], None)]
+    ncs.extend((name[i + 1], (name[i][0], name[i][1])) for i in range(2, len(name) - 1, 2))
+
+    # if one primitive, the glyph bounding box already is the zone
+    if len(name) < 3:
+        return NeumePlan(tuple(ncs), None, None, None)
+
+    num_ncs = int(len(name) / 2)
+    nc_names = list(name[2 * i: (2 * i) + 2] for i in range(0, num_ncs))
+
+    contours = find_numeric_contours(nc_names)
+    zone_pos = shift_zone_pos_positive(find_zone_positions(nc_names, contours, lig_width))
+    x_min, x_max, y_min, y_max = find_zone_edges(nc_names, contours, lig_width)
+
+    return NeumePlan(tuple(ncs), tuple(tuple(z) for z in zone_pos), x_max, y_max - y_min)
+
+
+def nc_offsets(ncs):
+    # diatonic distance of each nc from the glyph pitch, a step is taken from
+    # the lower note of a ligature
+    offsets = []
+    offset = 0
+    for (primitive, step) in ncs:
+        if step:
+            offset += pitch.steps(step[0], step[1])
+        offsets.append(offset)
+
+        if 'ligature' in primitive:
+            offset += pitch.ligature_steps(primitive)
+
+    return tuple(offsets)
+
+
+#########################
+# Zonify Bounding Boxes
+#########################
+
+def find_numeric_contours(nc_names):
+    contours = [0]
+    for x in nc_names:
+
+        if 'ligature' in x[1]:
+            contours.append(-(int(x[1].split('ligature')[1]) - 1))
+
+        if x[0][0] == 'u':
+            contours.append(int(x[0][1:]) - 1)
+        elif x[0][0] == 'd':
+            contours.append(-(int(x[0][1:]) - 1))
+        elif x[0][0] == 's':
+            contours.append(0)
+
+    return contours
+
+
+def find_zone_positions(nc_names, contours, lig_width):
+
+    # returns a 'relative' bounding_box for each nc
+    zone_pos = []
+    nudge = 0   # each lig requires a contour indices nudge
+
+    # get relative bounding box of first nc
+    r_ulx = 0
+    r_uly = 0
+
+    # need to do first glyph manually
+    if 'ligature' in nc_names[0][1]:
+        r_lrx = r_ulx + lig_width
+        r_lry = r_uly - contours[1] + 1
+        nudge += 1
+    else:
+        r_lrx = r_ulx + 1
+        r_lry = r_uly + 1
+    zone_pos.append([r_ulx, r_uly, r_lrx, r_lry])
+
+    # get the rest relative to the first
+    for i, nc in enumerate(nc_names[1:]):
+        r_ulx = r_lrx
+        r_uly = r_lry - contours[i + nudge + 1] - 1
+
+        # find lrx, lry
+        if 'ligature' in nc[1]:
+            r_lrx = r_ulx + lig_width
+            r_lry = r_uly - contours[i + nudge + 1]
+            nudge += 1
+        else:
+            r_lrx = r_ulx + 1
+            r_lry = r_uly + 1
+
+        zone_pos.append([r_ulx, r_uly, r_lrx, r_lry])
+
+    return zone_pos
+
+
+def find_zone_edges(nc_names, contours, lig_width):
+    # find boundaries of facs zone relative per glyph
+    # i.e. punctum/inclinatum gets 1x1, ligature2 gets 2x2
+
+    x_dim_max = sum((lig_width if 'ligature' in x[1] else 1) for x in nc_names)
+
+    y_dim_min = 0
+    y_dim_max = 0
+    flow = 0
+    for n in contours:
+        flow += n
+        if flow < y_dim_min:
+            y_dim_min = flow
+        if flow > y_dim_max:
+            y_dim_max = flow
+
+    return 0, x_dim_max, y_dim_min, y_dim_max + 1
+
+
+def shift_zone_pos_positive(zone_pos):
+    # move every zone down by the deepest negative y in one step
+    lowest = min(min(z[1], z[3]) for z in zone_pos)
+    if lowest < 0:
+        for z in zone_pos:
+            z[1] -= lowest
+            z[3] -= lowest
+
+    return zone_pos
+
+
+def zone_pos_is_positive(zone_pos):
+    for z in zone_pos:
+        for num in [z[1], z[3]]:
+            if num < 0:
+                return False
+    return True
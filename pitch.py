@@ -0,0 +1,76 @@
+from bisect import bisect_left
+
+# Diatonic pitch arithmetic.
+#
+# A pitch is a single integer, 7 * octave + step with steps counted from c,
+# so moving a neume by an interval is an addition and the note name and
+# octave come back out with divmod. Intervals are written as in neume names,
+# where 2 is one step away and 1 is a repetition.
+
+NOTES = 'cdefgab'
+STEPS = dict((n, i) for i, n in enumerate(NOTES))
+
+CONTOURS = {
+    'u': 1,     # upwards
+    'd': -1,    # downwards
+    's': 0,     # repetition
+}
+
+
+def to_diatonic(note, octave):
+    return 7 * int(octave) + STEPS[note]
+
+
+def from_diatonic(value):
+    # returns (note, octave)
+    octave, step = divmod(value, 7)
+    return NOTES[step], octave
+
+
+def steps(contour, interval):
+    # signed number of diatonic steps for a contour and interval
+    return CONTOURS.get(contour, 0) * (int(interval) - 1)
+
+
+def transpose(start, contours, intervals):
+    # every pitch of a neume, starting from start
+    values = [start]
+    for contour, interval in zip(contours, intervals):
+        values.append(values[-1] + steps(contour, interval))
+    return values
+
+
+def ligature_steps(name):
+    # a ligature's second note lies below the first, e.g. ligature3 is a third
+    return -(int(name.split('ligature')[1]) - 1)
+
+
+#########################
+# Octaves by Staff Position
+#########################
+
+# Staff positions count down from the top line, two per line. The octave of
+# a position depends on where the clef sits; each table is a list of band
+# upper bounds and the octave of each band. A band of None has no octave;
+# the f clef has always left the position three above its line without one.
+
+_octave_tables = {}
+
+
+def _octave_table(clef_type, clef_pos):
+    line = 10 - (2 * (clef_pos - 1))
+
+    if clef_type == 'c':
+        return [line, line + 7], [4, 3, 2]
+    elif clef_type == 'f':
+        return [line - 4, line - 3, line + 3], [4, None, 3, 2]
+    return [], [None]
+
+
+def staff_octave(clef_type, clef_pos, pos):
+    key = (clef_type, clef_pos)
+    if key not in _octave_tables:
+        _octave_tables[key] = _octave_table(clef_type, clef_pos)
+
+    bounds, octaves = _octave_tables[key]
+    return octaves[bisect_left(bounds, pos)]
@@ -0,0 +1,125 @@
+# generates synthetic JSOMR pages for scaling and stress tests
+# python synthetic.py -o (path) [--staves 8] [--glyphs-per-staff 120] [--seed 0]
+
+import sys
+import json
+import random
+import argparse
+
+NOTES = 'cdefgab'
+
+# neume name parts, weighted by repetition
+PRIMITIVES = ['punctum', 'punctum', 'punctum', 'inclinatum', 'ligature2', 'ligature3', 'ligature4']
+STEPS = ['u2', 'u2', 'd2', 'd2', 'u3', 'd3', 'u4', 'd4', 'u5', 'd5', 's1']
+OTHERS = ['clef.c', 'clef.f', 'custos', 'division.minor', 'division.final', 'accid.flat', 'accid.natural']
+
+NO_PITCH = {'strt_pos': 'None', 'clef_pos': 'None', 'note': 'None', 'octave': 'None', 'clef': 'None', 'staff': 'None'}
+
+
+def neume_name(rng, max_ncs):
+    # e.g. neume.punctum.u2.ligature3.d2.inclinatum
+    tokens = [rng.choice(PRIMITIVES)]
+    for _ in range(rng.randint(1, max_ncs) - 1):
+        tokens.extend([rng.choice(STEPS), rng.choice(PRIMITIVES)])
+    return 'neume.' + '.'.join(tokens)
+
+
+def generate(staves=8, glyphs_per_staff=120, neume_density=0.85, skip_share=0.2, max_ncs=5,
+             page_width=4400, page_height=7000, seed=0):
+    # returns a JSOMR dict; glyphs_per_staff counts glyphs on the staff,
+    # skips come on top as skip_share of the whole page
+    rng = random.Random(seed)
+    band = page_height // max(staves, 1)
+    margin = page_width // 20
+    staffWidth = page_width - 2 * margin
+    step = max(staffWidth // max(glyphs_per_staff, 1), 1)
+
+    page = {
+        'page': {'bounding_box': {'nrows': page_height, 'ulx': 0, 'uly': 0, 'ncols': page_width}, 'resolution': 0.0},
+        'staves': [],
+        'glyphs': [],
+    }
+
+    for s in range(1, staves + 1):
+        staffTop = (s - 1) * band + band // 4
+        staffHeight = band // 2
+        page['staves'].append({
+            'staff_no': s,
+            'bounding_box': {'nrows': staffHeight, 'ulx': margin, 'uly': staffTop, 'ncols': staffWidth},
+            'num_lines': 4,
+        })
+
+        clef = rng.choice(['clef.c', 'clef.f'])
+        clefPos = rng.randint(1, 4)
+        for i in range(glyphs_per_staff):
+            if i == 0:
+                name = clef
+            elif rng.random() < neume_density:
+                name = neume_name(rng, max_ncs)
+            else:
+                name = rng.choice(OTHERS)
+
+            ulx = margin + i * step + rng.randint(0, step // 3)
+            width = rng.randint(step // 3 + 1, step)
+            pos = rng.randint(1, 9)
+            page['glyphs'].append({
+                'glyph': {
+                    'bounding_box': {'nrows': rng.randint(staffHeight // 8 + 1, staffHeight // 2 + 1), 'ulx': ulx,
+                                     'uly': staffTop + rng.randint(0, staffHeight // 2), 'ncols': width},
+                    'name': name,
+                    'state': 'AUTOMATIC',
+                },
+                'pitch': {
+                    'strt_pos': str(pos),
+                    'clef_pos': str(clefPos),
+                    'note': rng.choice(NOTES),
+                    'octave': str(rng.randint(2, 4)),
+                    'offset': str(ulx),
+                    'clef': clef,
+                    'staff': str(s),
+                },
+            })
+
+    # skips are noise anywhere on the page
+    numGlyphs = len(page['glyphs'])
+    numSkips = int(numGlyphs * skip_share / (1 - skip_share)) if skip_share < 1 else 0
+    for _ in range(numSkips):
+        ulx = rng.randint(0, page_width - 10)
+        page['glyphs'].append({
+            'glyph': {
+                'bounding_box': {'nrows': rng.randint(1, 10), 'ulx': ulx, 'uly': rng.randint(0, page_height - 10), 'ncols': rng.randint(1, 10)},
+                'name': 'skip',
+                'state': 'AUTOMATIC',
+            },
+            'pitch': dict(NO_PITCH, offset=str(ulx)),
+        })
+
+    rng.shuffle(page['glyphs'])
+    return page
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic JSOMR page.')
+    parser.add_argument('-o', '--output', help='JSOMR path (default: stdout)')
+    parser.add_argument('--staves', type=int, default=8)
+    parser.add_argument('--glyphs-per-staff', type=int, default=120)
+    parser.add_argument('--neume-density', type=float, default=0.85, help='share of staff glyphs that are neumes')
+    parser.add_argument('--skip-share', type=float, default=0.2, help='share of all glyphs that are skips')
+    parser.add_argument('--max-ncs', type=int, default=5, help='most primitives in one neume name')
+    parser.add_argument('--page-width', type=int, default=4400)
+    parser.add_argument('--page-height', type=int, default=7000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    page = generate(args.staves, args.glyphs_per_staff, args.neume_density, args.skip_share, args.max_ncs,
+                    args.page_width, args.page_height, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(page, out)
+    else:
+        json.dump(page, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
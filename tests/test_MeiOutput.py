@@ -13,8 +13,8 @@ class T(unittest.TestCase):
         jsomr_cf18 = json.loads(f.read())
 
     kwargs = {
-        'max_width': 0.4,
-        'max_size': 8,
+        'max_neume_spacing': 0.4,
+        'max_group_size': 8,
         'version': 'N',
     }
 
@@ -23,11 +23,11 @@ class T(unittest.TestCase):
     ###########
 
     def test_a01_generate_synthMEI(self):
-        T.mei_obj_synth = MeiOutput(T.jsomr_synth, T.kwargs)
+        T.mei_obj_synth = MeiOutput(T.jsomr_synth, **T.kwargs)
         assert True
 
     def test_a02_generate_cf18MEI(self):
-        T.mei_obj = MeiOutput(T.jsomr_cf18, T.kwargs)
+        T.mei_obj = MeiOutput(T.jsomr_cf18, **T.kwargs)
         assert True
 
     ##########################
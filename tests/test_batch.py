@@ -0,0 +1,78 @@
+import unittest
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import batch
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.inDir = os.path.join(self.directory, 'in')
+        self.outDir = os.path.join(self.directory, 'out')
+        os.makedirs(self.inDir)
+
+        shutil.copy(T.inJSOMR_cf18, os.path.join(self.inDir, 'cf18.json'))
+        with open(os.path.join(self.inDir, 'small.json'), 'w') as f:
+            f.write('{"glyphs": [{"glyph": {}}]}')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_a01_collect_largest_first(self):
+        paths = batch.collect([self.inDir, os.path.join(self.inDir, '*.json')])
+        assert ['cf18.json', 'small.json'] == list(os.path.basename(p) for p in paths)
+
+    def test_a02_keeps_going_past_errors(self):
+        for workers in ['1', '2']:
+            out = io.StringIO()
+            batch.sys.stdout, stdout = out, batch.sys.stdout
+            try:
+                status = batch.main([self.inDir, '-o', self.outDir, '-j', workers, '--ids', 'counter'])
+            finally:
+                batch.sys.stdout = stdout
+
+            assert 1 == status
+            assert ['cf18.mei'] == os.listdir(self.outDir)
+            assert '1 of 2 pages' in out.getvalue()
+            assert 'KeyError' in out.getvalue()
+            shutil.rmtree(self.outDir)
+
+    def test_a03_compressed_inputs(self):
+        with open(T.inJSOMR_cf18, 'rb') as src, open(os.path.join(self.inDir, 'gz.json.gz'), 'wb') as dest:
+            dest.write(gzip.compress(src.read()))
+        os.remove(os.path.join(self.inDir, 'small.json'))
+
+        paths = batch.collect([self.inDir])
+        assert ['cf18.json', 'gz.json.gz'] == sorted(os.path.basename(p) for p in paths)
+        # within a factor of two of the count, without decompressing
+        assert 0.5 < batch.estimate_glyphs(paths[1]) / batch.estimate_glyphs(paths[0]) < 2
+
+        assert 0 == batch.main([self.inDir, '-o', self.outDir, '-j', '1', '--ids', 'counter'])
+        with open(os.path.join(self.outDir, 'cf18.mei')) as plain, open(os.path.join(self.outDir, 'gz.mei')) as compressed:
+            assert plain.read() == compressed.read()
+
+    def test_a04_broken_compressed_inputs(self):
+        with open(T.inJSOMR_cf18, 'rb') as src:
+            compressed = gzip.compress(src.read())
+        with open(os.path.join(self.inDir, 'truncated.json.gz'), 'wb') as dest:
+            dest.write(compressed[:len(compressed) // 2])
+        with open(os.path.join(self.inDir, 'zst.json.zst'), 'wb') as dest:
+            dest.write(b'\x28\xb5\x2f\xfd' + b'\0' * 16)
+        os.remove(os.path.join(self.inDir, 'small.json'))
+
+        out = io.StringIO()
+        batch.sys.stdout, stdout = out, batch.sys.stdout
+        try:
+            status = batch.main([self.inDir, '-o', self.outDir, '-j', '1', '--ids', 'counter'])
+        finally:
+            batch.sys.stdout = stdout
+
+        assert 1 == status
+        assert ['cf18.mei'] == os.listdir(self.outDir)
+        assert '1 of 3 pages' in out.getvalue()
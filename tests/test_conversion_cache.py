@@ -0,0 +1,64 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from conversion_cache import ConversionCache
+
+
+class T(unittest.TestCase):
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_a01_key(self):
+        cache = ConversionCache(self.directory)
+        key = cache.key(b'{}', T.kwargs, '0.1.0')
+        assert key == cache.key(b'{}', dict(T.kwargs), '0.1.0')
+        assert key != cache.key(b'{ }', T.kwargs, '0.1.0')
+        assert key != cache.key(b'{}', dict(T.kwargs, max_group_size=3), '0.1.0')
+        assert key != cache.key(b'{}', T.kwargs, '0.1.1')
+
+    def test_a02_hit_and_miss(self):
+        cache = ConversionCache(self.directory)
+        dest = os.path.join(self.directory, 'out.mei')
+        assert cache.get('abc') is None
+        assert not cache.copy_to('abc', dest)
+
+        cache.put('abc', '<mei />\n')
+        assert cache.copy_to('abc', dest)
+        with open(dest) as f:
+            assert '<mei />\n' == f.read()
+        assert ['abc.mei', 'out.mei'] == sorted(os.listdir(self.directory))
+
+    def test_a03_lru_eviction(self):
+        cache = ConversionCache(self.directory, max_bytes=250)
+        for key in ['a', 'b']:
+            cache.put(key, 'x' * 100)
+        past = time.time() - 60
+        os.utime(cache.path('a'), (past, past - 10))
+        os.utime(cache.path('b'), (past, past))
+
+        cache.get('a')      # a is now the most recently used
+        cache.put('c', 'x' * 100)
+        assert cache.get('b') is None
+        assert cache.get('a') is not None and cache.get('c') is not None
+
+    def test_a04_put_file(self):
+        cache = ConversionCache(self.directory)
+        source = os.path.join(self.directory, 'out.mei')
+        with open(source, 'w') as f:
+            f.write('<mei />\n')
+
+        cache.put_file('abc', source)
+        with open(cache.get('abc')) as f:
+            assert '<mei />\n' == f.read()
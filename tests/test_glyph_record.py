@@ -0,0 +1,40 @@
+import unittest
+import json
+from glyph_record import GlyphRecord
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    records = GlyphRecord.from_glyphs(jsomr_cf18['glyphs'])
+
+    def test_a01_fields(self):
+        for g, r in zip(T.jsomr_cf18['glyphs'], T.records):
+            assert g['glyph']['name'].split('.') == list(r.tokens)
+            assert g['glyph']['name'].split('.')[0] == r.category
+            assert g['glyph']['bounding_box'] is r.bounding_box
+            assert g['glyph']['bounding_box']['ulx'] == r.ulx
+            assert g['pitch']['note'] == str(r.note)
+            assert g['pitch']['octave'] == str(r.octave)
+            assert g['pitch']['strt_pos'] == str(r.strt_pos)
+
+    def test_a02_none_values(self):
+        skip = list(r for r in T.records if r.category == 'skip')
+        assert skip
+        for r in skip:
+            assert r.subtype is None
+            assert r.staff is None and r.octave is None and r.clef is None
+
+    def test_a03_shared_tokens(self):
+        punctums = list(r for r in T.records if r.name == 'neume.punctum')
+        assert len(punctums) > 1
+        assert all(r.tokens is punctums[0].tokens for r in punctums)
+
+    def test_a04_equal_records_hash_equal(self):
+        again = GlyphRecord.from_glyphs(T.jsomr_cf18['glyphs'])
+        assert again[0] is not T.records[0]
+        assert again[0] == T.records[0] and hash(again[0]) == hash(T.records[0])
+        assert len(set(T.records) | set(again)) == len(set(T.records))
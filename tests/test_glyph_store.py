@@ -0,0 +1,54 @@
+import unittest
+import json
+from glyph_store import GlyphStore
+from glyph_record import GlyphRecord
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    store = GlyphStore.from_glyphs(jsomr_cf18['glyphs'])
+
+    def test_a01_columns(self):
+        glyphs = T.jsomr_cf18['glyphs']
+        assert len(glyphs) == len(T.store)
+        for i in [0, 1000, len(glyphs) - 1]:
+            g = glyphs[i]
+            assert g['glyph']['bounding_box'] == T.store.bounding_box(i)
+            assert g['glyph']['name'] == T.store.string(T.store.name[i])
+            assert g['glyph']['name'].split('.')[0] == T.store.string(T.store.category[i])
+
+    def test_a02_none_values(self):
+        skip = T.store.category == T.store.code('skip')
+        assert (T.store.staff[skip] == -1).all()
+        assert (T.store.octave[skip] == -1).all()
+        assert (T.store.clef[skip] == -1).all()
+
+    def test_a03_staff_index(self):
+        mei_obj = MeiOutput(T.jsomr_cf18, **T.kwargs)
+        index = T.store.staff_index()
+        records = GlyphRecord.from_glyphs(T.jsomr_cf18['glyphs'])
+        assert sorted(mei_obj.staff_glyphs) == sorted(index)
+        for staff, rows in index.items():
+            assert mei_obj.get_staff_glyphs(staff) == list(records[i] for i in rows)
+
+    def test_b01_columnar_grouping(self):
+        mei_obj = MeiOutput(T.jsomr_cf18, **T.kwargs)
+        columnar = MeiOutput(T.jsomr_cf18, columnar=True, **T.kwargs)
+        assert mei_obj.avg_punc_width == columnar.avg_punc_width
+        for staff in T.jsomr_cf18['staves']:
+            expected = mei_obj._process_glyphs(mei_obj.get_staff_glyphs(staff['staff_no']))
+            assert expected == columnar._process_rows(columnar.staff_rows.get(staff['staff_no'], []))
+
+    def test_b02_records(self):
+        assert GlyphRecord.from_glyphs(T.jsomr_cf18['glyphs']) == T.store.records(list(range(len(T.store))))
@@ -0,0 +1,101 @@
+import unittest
+import random
+import json
+import grouping
+from glyph_record import GlyphRecord
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    mei_obj = MeiOutput(jsomr_cf18, **kwargs)
+
+    # (max_distance, max_group_size) pairs to compare under
+    settings = [(0, 8), (5, 8), (11, 8), (40, 8), (40, 2), (200, 3), (10 ** 6, 1)]
+
+    def _neumes(self, glyphs):
+        return list(g for g in glyphs if g.category == 'neume')
+
+    def _random_staff(self, rng, size):
+        names = ['neume.punctum', 'neume.inclinatum', 'neume.ligature2', 'neume.punctum.u2.punctum',
+                 'neume.punctum.d2.ligature3', 'neume.inclinatum.s1.punctum']
+        neumes = []
+        ulx = 0
+        for _ in range(size):
+            ulx += rng.randint(-5, 60)
+            neumes.append({
+                'glyph': {'name': rng.choice(names), 'bounding_box': {'nrows': 40, 'ulx': ulx, 'uly': 0, 'ncols': rng.randint(1, 50)}},
+                'pitch': {'staff': '1', 'note': 'c', 'octave': '3', 'strt_pos': '5', 'clef': 'clef.c'}})
+        return GlyphRecord.from_glyphs(neumes)
+
+    ##############
+    # Equivalence
+    ##############
+
+    def test_a01_group_neumes_cf18(self):
+        for staff_no in T.mei_obj.staff_glyphs:
+            neumes = self._neumes(T.mei_obj.get_staff_glyphs(staff_no))
+            for (distance, size) in T.settings:
+                expected = T.mei_obj._group_neumes_by_merging(neumes, distance, size)
+                assert expected == T.mei_obj._group_neumes(neumes, distance, size)
+
+    def test_a02_group_neumes_random(self):
+        rng = random.Random(18)
+        for size in [0, 1, 2, 3, 5, 40, 300]:
+            neumes = self._random_staff(rng, size)
+            for (distance, max_size) in T.settings:
+                expected = T.mei_obj._group_neumes_by_merging(neumes, distance, max_size)
+                assert expected == T.mei_obj._group_neumes(neumes, distance, max_size)
+
+    ###############
+    # Interleaving
+    ###############
+
+    def test_b01_interleave(self):
+        groups = [[10, 11], [30], [50, 51]]
+        singles = [5, 10, 40, 60]
+        expected = [[5], [10], [10, 11], [30], [40], [50, 51], [60]]
+        assert expected == grouping.interleave(groups, singles, lambda x: x)
+
+    def test_b02_process_glyphs_keeps_every_glyph(self):
+        for staff_no in T.mei_obj.staff_glyphs:
+            glyphs = T.mei_obj.get_staff_glyphs(staff_no)
+            processed = T.mei_obj._process_glyphs(glyphs)
+            assert sorted(id(g) for group in processed for g in group) == sorted(id(g) for g in glyphs)
+
+    ##############
+    # Input order
+    ##############
+
+    def test_c01_unsorted_input(self):
+        # glyphs out of ulx order group like the same glyphs sorted. equal
+        # ulx keep their order, as the index's sort is stable
+        glyphs = T.jsomr_cf18['glyphs']
+        ulx = lambda g: g['glyph']['bounding_box']['ulx']
+        rng = random.Random(7)
+        ranks = dict((x, rng.random()) for x in set(ulx(g) for g in glyphs))
+        shuffled = dict(T.jsomr_cf18, glyphs=sorted(glyphs, key=lambda g: ranks[ulx(g)]))
+        ordered = dict(T.jsomr_cf18, glyphs=sorted(glyphs, key=ulx))
+        assert shuffled['glyphs'] != ordered['glyphs']
+
+        kwargs = dict(T.kwargs, backend='stream', ids='counter')
+        for extra in [{}, {'columnar': True}]:
+            unsorted = MeiOutput(shuffled, **dict(kwargs, **extra))
+            expected = MeiOutput(ordered, **dict(kwargs, **extra))
+            for staff in T.jsomr_cf18['staves']:
+                glyphs = unsorted.get_staff_glyphs(staff['staff_no'])
+                sortedGlyphs = expected.get_staff_glyphs(staff['staff_no'])
+                assert list(g.ulx for g in glyphs) == sorted(g.ulx for g in glyphs)
+                assert glyphs == sortedGlyphs
+                assert unsorted._process_glyphs(glyphs) == expected._process_glyphs(sortedGlyphs)
+            assert expected.run() == unsorted.run()
@@ -0,0 +1,60 @@
+import unittest
+import json
+import re
+import idgen
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    def _ids(self, text):
+        return re.findall(r'xml:id="([^"]+)"', text)
+
+    ##############
+    # Strategies
+    ##############
+
+    def test_a01_counter(self):
+        ids = idgen.get_ids('counter', 'p1')
+        assert ['p1-1', 'p1-2'] == [ids.new_id('nc'), ids.new_id('nc')]
+
+    def test_a02_hashed(self):
+        ids = idgen.get_ids('hashed')
+        a = ids.new_id('zone', {'ulx': '1', 'uly': '2'}, 'm-s')
+        b = ids.new_id('zone', {'uly': '2', 'ulx': '1'}, 'm-s')
+        c = ids.new_id('zone', {'ulx': '1', 'uly': '2'}, 'm-t')
+        assert a + '-1' == b
+        assert len(set([a, b, c])) == 3
+        assert a == idgen.get_ids('hashed').new_id('zone', {'ulx': '1', 'uly': '2'}, 'm-s')
+
+    def test_a03_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            idgen.get_ids('sequential')
+
+    #############
+    # MeiOutput
+    #############
+
+    def test_b01_reproducible(self):
+        for strategy in ['counter', 'hashed']:
+            first = MeiOutput(T.jsomr_cf18, backend='stream', ids=strategy, **T.kwargs).run()
+            assert first == MeiOutput(T.jsomr_cf18, backend='etree', ids=strategy, **T.kwargs).run()
+
+            ids = self._ids(first)
+            assert len(ids) == len(set(ids))
+            assert set(re.findall(r'facs="([^"]+)"', first)) <= set(ids)
+
+    def test_b02_random(self):
+        first = MeiOutput(T.jsomr_cf18, backend='stream', **T.kwargs).run()
+        second = MeiOutput(T.jsomr_cf18, backend='stream', **T.kwargs).run()
+        assert not set(self._ids(first)) & set(self._ids(second))
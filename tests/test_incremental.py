@@ -0,0 +1,59 @@
+import unittest
+import copy
+import json
+import re
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    def _edited(self, staff_no):
+        # cf18 with one neume on staff_no renamed
+        jsomr = copy.deepcopy(T.jsomr_cf18)
+        for g in jsomr['glyphs']:
+            if g['pitch']['staff'] == str(staff_no) and g['glyph']['name'].startswith('neume.'):
+                g['glyph']['name'] = 'neume.inclinatum'
+                return jsomr
+
+    def test_a01_unchanged_page(self):
+        cache = {}
+        first = MeiOutput(T.jsomr_cf18, staff_cache=cache, ids='hashed', **T.kwargs)
+        text = first.run()
+        assert len(T.jsomr_cf18['staves']) == len(first.dirty_staves) == len(cache)
+
+        second = MeiOutput(T.jsomr_cf18, staff_cache=cache, ids='hashed', **T.kwargs)
+        assert text == second.run()
+        assert [] == second.dirty_staves
+
+    def test_a02_edited_staff(self):
+        cache = {}
+        MeiOutput(T.jsomr_cf18, staff_cache=cache, ids='hashed', **T.kwargs).run()
+
+        jsomr = self._edited(4)
+        mei_obj = MeiOutput(jsomr, staff_cache=cache, ids='hashed', **T.kwargs)
+        text = mei_obj.run()
+        assert [4] == mei_obj.dirty_staves
+        assert text == MeiOutput(jsomr, backend='stream', ids='hashed', **T.kwargs).run()
+
+    def test_a03_random_ids_stay_unique(self):
+        cache = {}
+        MeiOutput(T.jsomr_cf18, staff_cache=cache, **T.kwargs).run()
+        text = MeiOutput(self._edited(6), staff_cache=cache, **T.kwargs).run()
+
+        ids = re.findall(r'xml:id="([^"]+)"', text)
+        assert len(ids) == len(set(ids))
+        assert set(re.findall(r'facs="([^"]+)"', text)) <= set(ids)
+
+    def test_a04_counter_ids(self):
+        with self.assertRaises(ValueError):
+            MeiOutput(T.jsomr_cf18, staff_cache={}, ids='counter', **T.kwargs)
@@ -0,0 +1,88 @@
+import unittest
+import os
+import json
+import pstats
+import shutil
+import tempfile
+import instrumentation
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': 'stream',
+        'ids': 'counter',
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.jsomr = json.loads(file.read())
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_a01_nested_stages(self):
+        stats = instrumentation.Stats()
+        with stats.stage('build'):
+            with stats.stage('group'):
+                pass
+            stats.timed('serialize', lambda: None)()
+        stats.count('zones', 2)
+        stats.merge({'zones': 1, 'ncs': 4})
+
+        timings = stats.as_dict()['timings']
+        assert ['build', 'group', 'serialize'] == sorted(timings)
+        assert all(t >= 0 for t in timings.values())
+        assert {'zones': 3, 'ncs': 4} == stats.as_dict()['counters']
+
+    def test_a02_off_by_default(self):
+        mei_obj = MeiOutput(self.jsomr, **T.kwargs)
+        mei_obj.run()
+        assert mei_obj.stats is None
+        assert mei_obj.get_stats() is None
+
+    def test_a03_counters_match_output(self):
+        mei_obj = MeiOutput(self.jsomr, stats=True, **T.kwargs)
+        text = mei_obj.run()
+        stats = mei_obj.get_stats()
+        counters = stats['counters']
+
+        assert ['build', 'group', 'index', 'serialize', 'zonify'] == sorted(stats['timings'])
+        assert len(self.jsomr['glyphs']) == counters['glyphs']
+        assert sum(1 for g in self.jsomr['glyphs'] if g['glyph']['name'] == 'skip') == counters['skipped']
+        assert text.count('<zone ') == counters['zones']
+        assert text.count('<nc ') == counters['ncs']
+        assert text.count('<syllable ') == counters['groups']
+        assert text.count('ligature="true"') == 2 * counters['ligatures']
+
+    def test_a04_same_counters_when_streaming(self):
+        serial = MeiOutput(self.jsomr, stats=True, **T.kwargs)
+        serial.run()
+        streamed = MeiOutput(self.jsomr, stats=True, columnar=True, **T.kwargs)
+        with open(os.path.join(self.directory, 'out.mei'), 'w') as out:
+            streamed.write(out)
+
+        for name in ['glyphs', 'skipped', 'zones', 'ncs', 'groups', 'ligatures']:
+            assert serial.get_stats()['counters'][name] == streamed.get_stats()['counters'][name]
+
+    def test_a05_profilers_dump(self):
+        path = os.path.join(self.directory, 'run.prof')
+        MeiOutput(self.jsomr, profile='cprofile', profile_path=path, **T.kwargs).run()
+        assert pstats.Stats(path).total_calls > 0
+
+        path = os.path.join(self.directory, 'run.txt')
+        MeiOutput(self.jsomr, profile='tracemalloc', profile_path=path, **T.kwargs).run()
+        with open(path, 'r') as file:
+            assert file.readline().startswith('current ')
+
+        with self.assertRaises(ValueError):
+            MeiOutput(self.jsomr, profile='perf', **T.kwargs)
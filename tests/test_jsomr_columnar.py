@@ -0,0 +1,86 @@
+import unittest
+import os
+import json
+import pickle
+import shutil
+import tempfile
+import jsomr_io
+import jsomr_columnar
+import synthetic
+from glyph_store import GlyphStore
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': 'stream',
+        'ids': 'counter',
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.jsomr = json.loads(file.read())
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'cf18.jsomrc')
+        jsomr_columnar.save(cls.jsomr, cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_a01_same_columns(self):
+        page = jsomr_columnar.load(T.path)
+        store = GlyphStore.from_glyphs(self.jsomr['glyphs'])
+
+        assert self.jsomr['page'] == page['page']
+        assert self.jsomr['staves'] == page['staves']
+        assert store.strings == page['glyph_store'].strings
+        for (column, dtype) in GlyphStore.COLUMNS:
+            loaded = page['glyph_store'].columns[column]
+            assert not loaded.flags.owndata     # a view into the mapping
+            assert (store.columns[column] == loaded).all()
+
+    def test_a02_loaded_by_magic(self):
+        page = jsomr_io.load(T.path)
+        assert T.path.endswith(jsomr_columnar.SUFFIX) and 'glyph_store' in page
+
+        with open(T.path, 'rb') as file:
+            data = file.read()
+        assert 'columnar' == jsomr_io.detect(data)
+        assert self.jsomr['staves'] == jsomr_io.loads(data)['staves']
+
+        with self.assertRaises(ValueError):
+            jsomr_columnar.from_buffer(data.replace(b'JSOMRCOL', b'JSOMRCOX', 1))
+
+    def test_a03_same_output(self):
+        expected = MeiOutput(self.jsomr, **T.kwargs).run()
+        for kwargs in [{}, {'vectorized': True}, {'low_memory': True}, {'output_profile': 'compact'}]:
+            converted = MeiOutput(jsomr_io.load(T.path), **dict(T.kwargs, **kwargs)).run()
+            if kwargs.get('output_profile'):
+                assert converted == MeiOutput(self.jsomr, **dict(T.kwargs, **kwargs)).run()
+            else:
+                assert expected == converted
+
+    def test_a04_pooled_workers_map_the_file(self):
+        page = synthetic.generate(staves=3, glyphs_per_staff=60, seed=2)
+        path = os.path.join(T.directory, 'synthetic.jsomrc')
+        jsomr_columnar.save(page, path)
+        expected = MeiOutput(page, **T.kwargs).run()
+
+        loaded = jsomr_io.load(path)
+        assert len(pickle.dumps(loaded['glyph_store'])) < 1000     # the path, not the columns
+        pooled = MeiOutput(loaded, workers=2, **T.kwargs)
+        pooled.PARALLEL_MIN_GLYPHS = 0
+        assert expected == pooled.run()
+
+    def test_a05_cli(self):
+        outDir = os.path.join(T.directory, 'cli')
+        jsomr_columnar.main([T.inJSOMR_cf18, '-o', outDir])
+        with open(os.path.join(outDir, 'jsomr_output.jsomrc'), 'rb') as made, open(T.path, 'rb') as saved:
+            assert made.read() == saved.read()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import jsomr_io
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.text = file.read()
+            cls.jsomr = json.loads(cls.text)
+
+    def test_a01_backends_agree(self):
+        assert 'json' in jsomr_io.available()
+        for backend in jsomr_io.available():
+            assert self.jsomr == jsomr_io.load(T.inJSOMR_cf18, backend)
+            assert self.jsomr == jsomr_io.loads(self.text.encode('utf-8'), backend)
+
+    def test_a02_default_is_fastest_installed(self):
+        assert jsomr_io.available()[0] == jsomr_io.default_backend()
+        assert self.jsomr == jsomr_io.load(T.inJSOMR_cf18)
+
+    def test_a03_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            jsomr_io.loads(b'{}', 'simplejson')
+
+    def test_a04_gzip_by_magic_bytes(self):
+        directory = tempfile.mkdtemp()
+        try:
+            # the extensions lie, the first bytes don't
+            compressed = os.path.join(directory, 'page.json')
+            plain = os.path.join(directory, 'page.json.gz')
+            with open(compressed, 'wb') as file:
+                file.write(gzip.compress(self.text.encode('utf-8')))
+            shutil.copy(T.inJSOMR_cf18, plain)
+
+            with open(compressed, 'rb') as file:
+                assert 'gzip' == jsomr_io.detect(file.read())
+            for backend in jsomr_io.available():
+                assert self.jsomr == jsomr_io.load(compressed, backend)
+                assert self.jsomr == jsomr_io.load(plain, backend)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_a05_mapped(self):
+        with jsomr_io.mapped(T.inJSOMR_cf18) as data:
+            assert 'json' == jsomr_io.detect(data)
+            assert data is jsomr_io.decompress(data)
+            assert self.jsomr == jsomr_io.loads(data)
+
+        # large files are parsed from the mapping
+        size = jsomr_io.MAP_MIN_SIZE
+        jsomr_io.MAP_MIN_SIZE = 0
+        try:
+            for backend in jsomr_io.available():
+                assert self.jsomr == jsomr_io.load(T.inJSOMR_cf18, backend)
+        finally:
+            jsomr_io.MAP_MIN_SIZE = size
+
+        (fd, path) = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            with jsomr_io.mapped(path) as data:
+                assert b'' == data
+        finally:
+            os.remove(path)
+
+    def test_a06_zstd(self):
+        try:
+            import zstandard
+        except ImportError:
+            self.skipTest('zstandard not installed')
+        compressed = zstandard.ZstdCompressor().compress(self.text.encode('utf-8'))
+        assert 'zstd' == jsomr_io.detect(compressed)
+        assert self.jsomr == jsomr_io.loads(compressed)
@@ -0,0 +1,83 @@
+import unittest
+import gc
+import io
+import warnings
+import json
+import synthetic
+from glyph_store import GlyphStore     # imports numpy before anything is traced
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': 'stream',
+        'ids': 'counter',
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.jsomr = json.loads(file.read())
+        cls.expected = MeiOutput(cls.jsomr, **T.kwargs).run()
+
+    def test_a01_same_output(self):
+        for extra in [{}, {'columnar': True}, {'workers': 2}]:
+            mei_obj = MeiOutput(self.jsomr, low_memory=True, **dict(T.kwargs, **extra))
+            out = io.StringIO()
+            mei_obj.write(out)
+            assert self.expected == out.getvalue()
+            assert self.expected == MeiOutput(self.jsomr, low_memory=True, **dict(T.kwargs, **extra)).run()
+
+    def test_a02_releases_glyphs(self):
+        mei_obj = MeiOutput(self.jsomr, low_memory=True, **T.kwargs)
+        assert 'glyphs' not in mei_obj.incoming_data
+        assert 'glyphs' in self.jsomr
+
+        mei_obj.run()
+        assert {} == mei_obj.staff_glyphs
+        with self.assertRaises(RuntimeError):
+            mei_obj.run()
+
+        with self.assertRaises(ValueError):
+            MeiOutput(self.jsomr, low_memory=True, staff_cache={}, **dict(T.kwargs, ids='hashed'))
+
+    def test_a03_peak_memory(self):
+        mei_obj = MeiOutput(self.jsomr, low_memory=True, trace_memory=True, **T.kwargs)
+        mei_obj.write(io.StringIO())
+        memory = mei_obj.get_stats()['memory']
+        assert memory['peak_bytes'] >= memory['current_bytes'] > 0
+
+        mei_obj = MeiOutput(self.jsomr, stats=True, **T.kwargs)
+        mei_obj.run()
+        assert {} == mei_obj.get_stats()['memory']
+
+    def test_a04_failed_run_cleans_up(self):
+        mei_obj = MeiOutput(self.jsomr, low_memory=True, stats=True, **T.kwargs)
+        mei_obj.run()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', ResourceWarning)
+            with self.assertRaises(RuntimeError):
+                mei_obj.write(io.StringIO())
+            gc.collect()
+
+        assert not list(w for w in caught if issubclass(w.category, ResourceWarning))
+        assert [] == mei_obj.stats._stack
+
+    def test_a05_peak_memory_columnar(self):
+        page = synthetic.generate(staves=6, glyphs_per_staff=150, seed=3)
+        peaks = {}
+        for extra in [{}, {'low_memory': True}, {'columnar': True}, {'columnar': True, 'low_memory': True}]:
+            mei_obj = MeiOutput(page, trace_memory=True, **dict(T.kwargs, **extra))
+            mei_obj.write(io.StringIO())
+            assert isinstance(mei_obj.glyph_store, GlyphStore) == bool(extra.get('columnar'))
+            if extra.get('low_memory'):
+                assert mei_obj.glyphs is None
+            peaks[tuple(sorted(extra))] = mei_obj.get_stats()['memory']['peak_bytes']
+
+        assert peaks[('columnar', 'low_memory')] < peaks[('columnar',)]
+        assert peaks[('columnar', 'low_memory')] < 1.25 * peaks[('low_memory',)]
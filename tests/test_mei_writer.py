@@ -0,0 +1,111 @@
+import unittest
+import io
+import re
+import json
+import xml.etree.ElementTree as ET
+from mei_writer import MeiStreamWriter, StreamBuilder, element_events, START, END, COMMENT
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    def _write(self, events, depth=0):
+        out = io.StringIO()
+        MeiStreamWriter(out, depth).write_events(events)
+        return out.getvalue()
+
+    def _strip_ids(self, text):
+        return re.sub(r'm-[0-9a-f-]{36}', '', text)
+
+    ##########
+    # Writer
+    ##########
+
+    def test_a01_empty_and_nested(self):
+        events = [
+            (START, 'staff', [('n', '1')]),
+            (START, 'layer', []),
+            (END, 'layer'),
+            (END, 'staff'),
+        ]
+        assert '<staff n="1">\n\t<layer />\n</staff>\n' == self._write(events)
+
+    def test_a02_comment_and_depth(self):
+        events = [(START, 'syllable', []), (COMMENT, 'punctum'), (END, 'syllable')]
+        assert '\t\t<syllable>\n\t\t\t<!--punctum-->\n\t\t</syllable>\n' == self._write(events, 2)
+
+    def test_a03_escape_attributes(self):
+        events = [(START, 'graphic', [('xlink:href', 'a&b "c".png')]), (END, 'graphic')]
+        assert '<graphic xlink:href="a&amp;b &quot;c&quot;.png" />\n' == self._write(events)
+
+    def test_a04_element_events(self):
+        builder = StreamBuilder()
+        el = builder.element(None, 'neume')
+        nc = builder.element(el, 'nc', {'pname': 'c'})
+        assert [(START, 'neume', [('xml:id', el.id)]),
+                (START, 'nc', [('xml:id', nc.id), ('pname', 'c')]),
+                (END, 'nc'),
+                (END, 'neume')] == list(element_events(el))
+
+    #############
+    # Streaming
+    #############
+
+    def test_b01_write_cf18(self):
+        out = io.StringIO()
+        MeiOutput(T.jsomr_cf18, **T.kwargs).write(out)
+        text = out.getvalue()
+
+        # like documentToText, xlink is left undeclared, so check by pattern
+        zones = set(re.findall(r'<zone xml:id="([^"]+)"', text))
+        facs = re.findall(r' facs="([^"]+)"', text)
+        assert len(T.jsomr_cf18['staves']) == len(re.findall(r'<staff ', text))
+        assert facs and set(facs) <= zones
+        assert text.endswith('</mei>\n')
+
+    def test_b02_iter_events_matches_write(self):
+        mei_obj = MeiOutput(T.jsomr_cf18, **T.kwargs)
+        out = io.StringIO()
+        mei_obj.write(out)
+
+        events = io.StringIO()
+        writer = MeiStreamWriter(events)
+        writer.write_declaration()
+        writer.write_events(mei_obj.iter_events())
+        assert self._strip_ids(out.getvalue()) == self._strip_ids(events.getvalue())
+
+        # staves are replayed from the spool, zones closed with the iterator
+        low = MeiOutput(T.jsomr_cf18, low_memory=True, **T.kwargs)
+        low.SPOOL_SIZE = 16
+        events = io.StringIO()
+        writer = MeiStreamWriter(events)
+        writer.write_declaration()
+        writer.write_events(low.iter_events())
+        assert self._strip_ids(out.getvalue()) == self._strip_ids(events.getvalue())
+        assert low.surface.file.closed
+
+    def test_b03_spilled_staves(self):
+        mei_obj = MeiOutput(T.jsomr_cf18, **T.kwargs)
+        out = io.StringIO()
+        mei_obj.write(out)
+
+        mei_obj.SPOOL_SIZE = 16
+        spilled = io.StringIO()
+        mei_obj.write(spilled)
+        assert self._strip_ids(out.getvalue()) == self._strip_ids(spilled.getvalue())
+
+    def test_b04_comment_text(self):
+        out = io.StringIO()
+        MeiStreamWriter(out).write((COMMENT, 'a--b-'))
+        assert '<!--a- -b- -->\n' == out.getvalue()
+        ET.fromstring('<a>' + out.getvalue() + '</a>')
@@ -0,0 +1,74 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import synthetic
+from multi_page import MultiPageOutput
+from MeiOutput import MeiOutput
+
+MEI = '{http://www.music-encoding.org/ns/mei}'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'ids': 'counter',
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.synthetic = os.path.join(self.directory, 'synthetic.json')
+        with open(self.synthetic, 'w') as f:
+            json.dump(synthetic.generate(staves=3, glyphs_per_staff=40, seed=5), f)
+        self.paths = [T.inJSOMR_cf18, self.synthetic, T.inJSOMR_cf18]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def parse(self, text):
+        return ET.fromstring(text.replace('xlink:href', 'href').encode('utf-8'))
+
+    def test_a01_surface_and_pb_per_page(self):
+        root = self.parse(MultiPageOutput(self.paths, **T.kwargs).run())
+        surfaces = list(root.iter(MEI + 'surface'))
+        pbs = list(root.iter(MEI + 'pb'))
+
+        assert 3 == len(surfaces) and 3 == len(pbs)
+        assert list(s.get(XML_ID) for s in surfaces) == list(pb.get('facs') for pb in pbs)
+        assert ['1', '2', '3'] == list(pb.get('n') for pb in pbs)
+
+        section = next(root.iter(MEI + 'section'))
+        assert ['pb', 'staff'] == sorted(set(c.tag[len(MEI):] for c in section))
+
+    def test_a02_same_pages_as_single_conversions(self):
+        root = self.parse(MultiPageOutput(self.paths, **T.kwargs).run())
+        section = next(root.iter(MEI + 'section'))
+        staves = list(section.iter(MEI + 'staff'))
+
+        expected = 0
+        for path in self.paths:
+            with open(path) as f:
+                page = self.parse(MeiOutput(json.load(f), backend='stream', **T.kwargs).run())
+            expected += len(list(page.iter(MEI + 'staff')))
+            assert len(list(page.iter(MEI + 'zone'))) in list(len(s) - 1 for s in root.iter(MEI + 'surface'))
+        assert expected == len(staves)
+
+    def test_a03_unique_ids(self):
+        for ids in ['counter', 'hashed', 'random']:
+            for workers in [1, 2]:
+                text = MultiPageOutput(self.paths, workers=workers, **dict(T.kwargs, ids=ids)).run()
+                root = self.parse(text)
+                allIds = list(e.get(XML_ID) for e in root.iter())
+                assert len(allIds) == len(set(allIds))
+                assert all(e.get('facs') in set(allIds) for e in root.iter() if e.get('facs'))
+
+    def test_a04_same_output_serial_and_parallel(self):
+        serial = MultiPageOutput(self.paths, **T.kwargs).run()
+        assert serial == MultiPageOutput(self.paths, workers=2, **T.kwargs).run()
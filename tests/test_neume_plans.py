@@ -0,0 +1,47 @@
+import unittest
+import neume_plans
+
+
+class T(unittest.TestCase):
+
+    lig_width = 2
+
+    bounding_box = {
+        'nrows': 300,
+        'ulx': 10,
+        'uly': 20,
+        'ncols': 300,
+    }
+
+    ############
+    # Compiling
+    ############
+
+    def test_a01_singular_plan(self):
+        plan = neume_plans.compile_plan('neume.inclinatum', T.lig_width)
+        assert (('inclinatum', None),) == plan.ncs
+        assert [T.bounding_box] == plan.place(T.bounding_box)
+
+    def test_a02_compound_plan(self):
+        plan = neume_plans.compile_plan('neume.punctum.u2.ligature3.d2.inclinatum', T.lig_width)
+        assert (('punctum', None), ('ligature3', ('u', '2')), ('inclinatum', ('d', '2'))) == plan.ncs
+        assert neume_plans.zone_pos_is_positive(plan.zones)
+        assert 3 == len(plan.place(T.bounding_box))
+
+    def test_a03_plans_are_cached(self):
+        name = 'neume.punctum.d2.punctum.s1.punctum'
+        assert neume_plans.compile_plan(name, T.lig_width) is neume_plans.compile_plan(name, T.lig_width)
+
+    def test_a04_long_compound(self):
+        name = 'neume.punctum' + '.u2.punctum.d2.punctum' * 1500
+        plan = neume_plans.compile_plan(name, T.lig_width)
+        assert 3001 == len(plan.place(T.bounding_box))
+
+    ##################
+    # Zone Positions
+    ##################
+
+    def test_b01_shift_zone_pos_positive(self):
+        zone_pos = [[0, 0, 1, 1], [1, -1, 2, 0], [2, -2, 3, -1]]
+        expected = [[0, 2, 1, 3], [1, 1, 2, 2], [2, 0, 3, 1]]
+        assert expected == neume_plans.shift_zone_pos_positive(zone_pos)
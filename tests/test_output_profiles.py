@@ -0,0 +1,88 @@
+import unittest
+import io
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import synthetic
+import batch
+from MeiOutput import MeiOutput
+from multi_page import MultiPageOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': 'stream',
+        'ids': 'counter',
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.jsomr = json.loads(file.read())
+
+    def parse(self, text):
+        return ET.fromstring(text.replace('xlink:href', 'href').encode('utf-8'))
+
+    def shape(self, root):
+        return list((e.tag, sorted(e.attrib.items())) for e in root.iter())
+
+    def test_a01_debug_by_default(self):
+        expected = MeiOutput(self.jsomr, **T.kwargs).run()
+        assert expected == MeiOutput(self.jsomr, output_profile='debug', **T.kwargs).run()
+        assert '<!--' in expected
+
+    def test_a02_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            MeiOutput(self.jsomr, output_profile='tiny', **T.kwargs)
+
+    def test_a03_compact_same_elements(self):
+        debug = MeiOutput(self.jsomr, **T.kwargs).run()
+        compact = MeiOutput(self.jsomr, output_profile='compact', **T.kwargs).run()
+
+        assert '<!--' not in compact
+        assert '\n' not in compact and '\t' not in compact
+        assert len(compact) < len(debug)
+        assert self.shape(self.parse(debug)) == self.shape(self.parse(compact))
+
+    def test_a04_compressed_is_gzipped_compact(self):
+        compact = MeiOutput(self.jsomr, output_profile='compact', **T.kwargs).run()
+        compressed = MeiOutput(self.jsomr, output_profile='compressed', **T.kwargs).run()
+
+        assert gzip.decompress(compressed).decode('utf-8') == compact
+        assert compressed == MeiOutput(self.jsomr, output_profile='compressed', **T.kwargs).run()
+
+        out = io.BytesIO()
+        MeiOutput(self.jsomr, output_profile='compressed', compress_level=1, **T.kwargs).write(out)
+        assert gzip.decompress(out.getvalue()).decode('utf-8') == compact
+
+    def test_a05_same_output_streamed_and_pooled(self):
+        page = synthetic.generate(staves=3, glyphs_per_staff=60, seed=2)
+        expected = MeiOutput(page, output_profile='compact', **T.kwargs).run()
+
+        pooled = MeiOutput(page, output_profile='compact', workers=2, **T.kwargs)
+        pooled.PARALLEL_MIN_GLYPHS = 0
+        assert expected == pooled.run()
+        assert expected == MeiOutput(page, output_profile='compact', low_memory=True, **T.kwargs).run()
+
+    def test_a06_multi_page_and_batch(self):
+        directory = tempfile.mkdtemp()
+        try:
+            book = MultiPageOutput([T.inJSOMR_cf18] * 2, output_profile='compressed', **T.kwargs)
+            text = gzip.decompress(book.run()).decode('utf-8')
+            assert '\n' not in text and '<!--' not in text
+            assert len(list(self.parse(text).iter('{http://www.music-encoding.org/ns/mei}surface'))) == 2
+
+            outDir = os.path.join(directory, 'out')
+            assert batch.main([T.inJSOMR_cf18, '-o', outDir, '-j', '1', '--ids', 'counter', '--profile', 'compressed']) == 0
+            with gzip.open(os.path.join(outDir, 'jsomr_output.mei.gz'), 'rt', encoding='utf-8') as file:
+                assert file.read() == MeiOutput(self.jsomr, output_profile='compact', **T.kwargs).run()
+        finally:
+            shutil.rmtree(directory)
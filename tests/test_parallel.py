@@ -0,0 +1,49 @@
+import unittest
+import copy
+import json
+import re
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    def _pooled(self, jsomr, **kwargs):
+        mei_obj = MeiOutput(jsomr, workers=2, **dict(T.kwargs, **kwargs))
+        mei_obj.PARALLEL_MIN_GLYPHS = 0
+        assert mei_obj._use_pool()
+        return mei_obj.run()
+
+    def test_a01_same_as_serial(self):
+        for ids in ['counter', 'hashed']:
+            serial = MeiOutput(T.jsomr_cf18, backend='stream', ids=ids, **T.kwargs).run()
+            assert serial == self._pooled(T.jsomr_cf18, ids=ids)
+
+    def test_a02_shared_zones(self):
+        # a glyph repeated on another staff makes the same hashed zone twice
+        jsomr = copy.deepcopy(T.jsomr_cf18)
+        glyph = next(g for g in jsomr['glyphs'] if g['pitch']['staff'] == '1' and g['glyph']['name'].startswith('neume.'))
+        twin = copy.deepcopy(glyph)
+        twin['pitch']['staff'] = '4'
+        jsomr['glyphs'].append(twin)
+
+        serial = MeiOutput(jsomr, backend='stream', ids='hashed', **T.kwargs).run()
+        assert serial == self._pooled(jsomr, ids='hashed')
+
+    def test_a03_random_ids(self):
+        text = self._pooled(T.jsomr_cf18)
+        ids = re.findall(r'xml:id="([^"]+)"', text)
+        assert len(ids) == len(set(ids))
+        assert set(re.findall(r'facs="([^"]+)"', text)) <= set(ids)
+
+    def test_a04_small_page_is_serial(self):
+        assert not MeiOutput(T.jsomr_cf18, workers=4, **T.kwargs)._use_pool()
@@ -0,0 +1,49 @@
+import unittest
+import pitch
+import neume_plans
+
+
+class T(unittest.TestCase):
+
+    ############
+    # Diatonic
+    ############
+
+    def test_a01_round_trip(self):
+        for octave in range(0, 6):
+            for note in pitch.NOTES:
+                assert (note, octave) == pitch.from_diatonic(pitch.to_diatonic(note, str(octave)))
+
+    def test_a02_steps(self):
+        assert 1 == pitch.steps('u', '2')
+        assert -4 == pitch.steps('d', 5)
+        assert 0 == pitch.steps('s', '3')
+        assert -2 == pitch.ligature_steps('ligature3')
+
+    def test_a03_transpose(self):
+        start = pitch.to_diatonic('b', 3)
+        values = pitch.transpose(start, ['u', 'd', 'd'], [2, 3, 8])
+        assert [('b', 3), ('c', 4), ('a', 3), ('a', 2)] == list(pitch.from_diatonic(v) for v in values)
+
+    def test_a04_plan_offsets(self):
+        plan = neume_plans.compile_plan('neume.punctum.u2.ligature3.d2.inclinatum', 2)
+        assert (0, 1, -2) == plan.offsets
+
+    ###########
+    # Octaves
+    ###########
+
+    def test_b01_c_clef(self):
+        # c clef on the top line sits at position 10
+        assert 4 == pitch.staff_octave('c', 1, 10)
+        assert 3 == pitch.staff_octave('c', 1, 11)
+        assert 3 == pitch.staff_octave('c', 1, 17)
+        assert 2 == pitch.staff_octave('c', 1, 18)
+
+    def test_b02_f_clef(self):
+        assert 4 == pitch.staff_octave('f', 2, 4)
+        assert pitch.staff_octave('f', 2, 5) is None
+        assert 3 == pitch.staff_octave('f', 2, 6)
+        assert 3 == pitch.staff_octave('f', 2, 11)
+        assert 2 == pitch.staff_octave('f', 2, 12)
+        assert pitch.staff_octave('x', 2, 0) is None
@@ -0,0 +1,39 @@
+import unittest
+import synthetic
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    def test_a01_seeded(self):
+        assert synthetic.generate(staves=3, seed=4) == synthetic.generate(staves=3, seed=4)
+        assert synthetic.generate(staves=3, seed=4) != synthetic.generate(staves=3, seed=5)
+
+    def test_a02_shape(self):
+        page = synthetic.generate(staves=5, glyphs_per_staff=40, skip_share=0.5, max_ncs=3)
+        assert [1, 2, 3, 4, 5] == list(s['staff_no'] for s in page['staves'])
+
+        names = list(g['glyph']['name'] for g in page['glyphs'])
+        assert 400 == len(names)
+        assert 200 == names.count('skip')
+        for name in names:
+            if name.startswith('neume.'):
+                assert len(name.split('.')) in [2, 4, 6]
+
+        for g in page['glyphs']:
+            bounding_box = g['glyph']['bounding_box']
+            assert bounding_box['ulx'] + bounding_box['ncols'] <= page['page']['bounding_box']['ncols']
+
+    def test_a03_converts(self):
+        page = synthetic.generate(staves=4, glyphs_per_staff=60, seed=2)
+        mei_obj = MeiOutput(page, backend='stream', **T.kwargs)
+        text = mei_obj.run()
+        assert 4 == text.count('<staff ')
+        staffGlyphs = sum(len(mei_obj.get_staff_glyphs(s)) for s in range(1, 5))
+        assert 240 == staffGlyphs
@@ -0,0 +1,47 @@
+import unittest
+import re
+import json
+import tree_backends
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    def _run(self, backend):
+        return MeiOutput(T.jsomr_cf18, backend=backend, **T.kwargs).run()
+
+    def _normalize_ids(self, text):
+        # number ids in order of appearance so facs references still match up
+        ids = {}
+        return re.sub(r'm-[0-9a-f-]{36}', lambda m: ids.setdefault(m.group(0), 'id%d' % len(ids)), text)
+
+    def test_a01_etree_matches_stream(self):
+        assert self._normalize_ids(self._run('stream')) == self._normalize_ids(self._run('etree'))
+
+    def test_a02_lxml(self):
+        try:
+            from lxml import etree
+        except ImportError:
+            self.skipTest('lxml not installed')
+
+        root = etree.fromstring(self._run('lxml').encode('utf-8'))
+        ns = {'mei': tree_backends.MEI_NS}
+        xml_id = '{%s}id' % tree_backends.XML_NS
+        zones = set(z.get(xml_id) for z in root.iterfind('.//mei:zone', ns))
+        facs = set(e.get('facs') for e in root.iter() if e.get('facs'))
+        assert len(T.jsomr_cf18['staves']) == len(root.findall('.//mei:staff', ns))
+        assert facs and facs <= zones
+
+    def test_a03_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            tree_backends.get_builder('libxml3')
@@ -0,0 +1,98 @@
+import unittest
+import random
+import json
+import vector_grouping
+from glyph_store import GlyphStore
+from glyph_record import GlyphRecord
+from MeiOutput import MeiOutput
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    with open(inJSOMR_cf18, 'r') as f:
+        jsomr_cf18 = json.loads(f.read())
+
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': 'N',
+    }
+
+    mei_obj = MeiOutput(jsomr_cf18, **kwargs)
+
+    # (max_distance, max_group_size) pairs to compare under
+    settings = [(0, 8), (5, 8), (11, 8), (40, 8), (40, 2), (200, 3), (10 ** 6, 1)]
+
+    def _glyph(self, name, staff, ulx, ncols):
+        return {
+            'glyph': {'name': name, 'bounding_box': {'nrows': 40, 'ulx': ulx, 'uly': 0, 'ncols': ncols}},
+            'pitch': {'staff': str(staff), 'note': 'c', 'octave': '3', 'strt_pos': '5', 'clef': 'clef.c'},
+        }
+
+    def _random_page(self, rng, staves, size):
+        names = ['neume.punctum', 'neume.inclinatum', 'neume.ligature2', 'neume.punctum.u2.punctum',
+                 'neume.punctum.d2.ligature3', 'neume.inclinatum.s1.punctum', 'clef.c', 'custos']
+        glyphs = []
+        for staff in range(1, staves + 1):
+            ulx = 0
+            for _ in range(rng.randint(0, size)):
+                ulx += rng.randint(1, 60)
+                glyphs.append(self._glyph(rng.choice(names), staff, ulx, rng.randint(1, 50)))
+        rng.shuffle(glyphs)
+        return glyphs
+
+    def _expected(self, glyphs, distance, size):
+        # reference grouping per staff, as lists of glyph indices
+        glyphs = GlyphRecord.from_glyphs(glyphs)
+        staves = {}
+        for i, g in enumerate(glyphs):
+            if g.category == 'neume':
+                staves.setdefault(g.staff, []).append(i)
+
+        groups = []
+        for staff in sorted(staves):
+            rows = sorted(staves[staff], key=lambda i: glyphs[i].ulx)
+            for group in T.mei_obj._group_neumes_by_merging(list(glyphs[i] for i in rows), distance, size):
+                groups.append(list(rows.pop(0) for _ in group))
+        return groups
+
+    def _vectorized(self, store, distance, size):
+        ids = vector_grouping.group_ids(store, distance, size)
+        groups = {}
+        for row in vector_grouping.neume_rows(store).tolist():
+            groups.setdefault(int(ids[row]), []).append(row)
+        assert (ids == -1).sum() == len(store) - sum(len(g) for g in groups.values())
+        return list(groups[k] for k in sorted(groups))
+
+    ##############
+    # Equivalence
+    ##############
+
+    def test_a01_group_ids_cf18(self):
+        glyphs = T.jsomr_cf18['glyphs']
+        store = GlyphStore.from_glyphs(glyphs)
+        for (distance, size) in T.settings:
+            assert self._expected(glyphs, distance, size) == self._vectorized(store, distance, size)
+
+    def test_a02_group_ids_random(self):
+        rng = random.Random(7)
+        for (staves, size) in [(0, 0), (1, 1), (3, 2), (5, 40), (20, 300)]:
+            glyphs = self._random_page(rng, staves, size)
+            store = GlyphStore.from_glyphs(glyphs)
+            for (distance, max_size) in T.settings:
+                assert self._expected(glyphs, distance, max_size) == self._vectorized(store, distance, max_size)
+
+    ###############
+    # MeiOutput
+    ###############
+
+    def test_b01_vectorized_process_rows(self):
+        vectorized = MeiOutput(T.jsomr_cf18, vectorized=True, **T.kwargs)
+        for staff in T.jsomr_cf18['staves']:
+            expected = T.mei_obj._process_glyphs(T.mei_obj.get_staff_glyphs(staff['staff_no']))
+            assert expected == vectorized._process_rows(vectorized.staff_rows.get(staff['staff_no'], []))
+
+    def test_b02_group_starts(self):
+        assert vector_grouping.group_starts([]) == []
+        assert vector_grouping.group_starts([4, 4, 5, 7, 7, 7]) == [0, 2, 3]
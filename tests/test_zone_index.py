@@ -0,0 +1,115 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import synthetic
+from MeiOutput import MeiOutput
+from zone_index import ZoneIndex
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': 'stream',
+        'ids': 'counter',
+        'zone_index': True,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.jsomr = json.loads(file.read())
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_a01_queries(self):
+        index = ZoneIndex(cell_size=10)
+        index.add_zone('z1', 0, 0, 5, 5)
+        index.add_zone('z2', 20, 20, 45, 30)
+        index.add_zone('z3', 100, 0, 110, 10)
+        index.link('z1', 'nc1', 'nc')
+        index.link('z1', 'nc2', 'nc')
+        index.link('z2', 'clef1', 'clef')
+
+        assert [('nc1', 'nc'), ('nc2', 'nc'), ('clef1', 'clef')] == index.elements_in_rect(0, 0, 30, 30)
+        assert [('clef1', 'clef')] == index.elements_in_rect(40, 25, 41, 26)
+        assert [('clef1', 'clef')] == index.elements_in_rect(0, 0, 30, 30, names=('clef',))
+        assert [] == index.elements_in_rect(50, 50, 60, 60)
+
+        assert ('clef1', 'clef') == index.nearest_element(30, 25)
+        assert ('clef1', 'clef') == index.nearest_element(60, 60)
+        assert ('nc1', 'nc') == index.nearest_element(-50, -50)
+        assert ('nc1', 'nc') == index.nearest_element(90, 5, names=('nc',))    # z3 has no element
+        assert index.nearest_element(0, 0, names=('custos',)) is None
+        assert ZoneIndex().nearest_element(0, 0) is None
+
+    def test_a02_indexes_every_facs(self):
+        mei_obj = MeiOutput(self.jsomr, stats=True, **T.kwargs)
+        text = mei_obj.run()
+        index = mei_obj.zone_index
+
+        assert mei_obj.get_stats()['counters']['zones'] == len(index.boxes)
+        assert text.count('facs=') == sum(len(e) for e in index.elements.values())
+        names = set(n for elements in index.elements.values() for (e, n) in elements)
+        assert {'staff', 'clef', 'nc', 'custos', 'accid'} <= names
+
+        staff = self.jsomr['staves'][0]['bounding_box']
+        found = index.elements_in_rect(staff['ulx'], staff['uly'], staff['ulx'] + staff['ncols'], staff['uly'] + staff['nrows'], names=('staff',))
+        assert found and all(n == 'staff' for (e, n) in found)
+
+    def test_a03_same_index_on_every_path(self):
+        page = synthetic.generate(staves=3, glyphs_per_staff=60, seed=4)
+        kwargs = dict(T.kwargs, ids='hashed')
+        expected = MeiOutput(page, **kwargs)
+        expected.run()
+
+        pooled = MeiOutput(page, workers=2, **kwargs)
+        pooled.PARALLEL_MIN_GLYPHS = 0
+        pooled.run()
+        assert expected.zone_index.to_dict() == pooled.zone_index.to_dict()
+
+        cache = {}
+        MeiOutput(page, staff_cache=cache, **kwargs).run()
+        cached = MeiOutput(page, staff_cache=cache, **kwargs)
+        cached.run()
+        assert [] == cached.dirty_staves
+        assert expected.zone_index.to_dict() == cached.zone_index.to_dict()
+
+    def test_a04_sidecar(self):
+        mei_obj = MeiOutput(self.jsomr, share_zones=True, **T.kwargs)
+        mei_obj.run()
+        path = os.path.join(self.directory, 'page.zones.json')
+        mei_obj.zone_index.save(path)
+
+        loaded = ZoneIndex.load(path)
+        assert mei_obj.zone_index.to_dict() == loaded.to_dict()
+        assert mei_obj.zone_index.nearest_element(1000, 1000) == loaded.nearest_element(1000, 1000)
+
+        with open(path) as f:
+            data = json.load(f)
+        data['version'] = 0
+        with self.assertRaises(ValueError):
+            ZoneIndex.from_dict(data)
+
+    def test_a05_far_queries(self):
+        mei_obj = MeiOutput(self.jsomr, **T.kwargs)
+        mei_obj.run()
+        index = mei_obj.zone_index
+
+        def distance(element, x, y):
+            return min(index._distance(index.boxes[z], x, y) for z in index.elements if element in index.elements[z])
+
+        # far outside the page only the occupied cells are searched, which
+        # used to walk every empty ring in between
+        for (x, y) in [(10 ** 7, 10 ** 7), (-10 ** 7, 500), (1000, -10 ** 9), (2000, 1500)]:
+            nearest = min(index._distance(index.boxes[z], x, y) for z in index.elements)
+            assert nearest == distance(index.nearest_element(x, y), x, y)
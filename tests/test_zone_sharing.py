@@ -0,0 +1,60 @@
+import unittest
+import json
+import xml.etree.ElementTree as ET
+import synthetic
+from MeiOutput import MeiOutput
+
+MEI = '{http://www.music-encoding.org/ns/mei}'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+
+
+class T(unittest.TestCase):
+
+    inJSOMR_cf18 = './tests/cf18_res/classification/jsomr_output.json'
+    kwargs = {
+        'max_neume_spacing': 0.3,
+        'max_group_size': 8,
+        'version': '4.0.0',
+        'backend': 'stream',
+        'ids': 'counter',
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open(T.inJSOMR_cf18, 'r') as file:
+            cls.jsomr = json.loads(file.read())
+
+    def parse(self, text):
+        return ET.fromstring(text.replace('xlink:href', 'href').encode('utf-8'))
+
+    def boxes(self, root):
+        zones = dict((z.get(XML_ID), (z.get('ulx'), z.get('uly'), z.get('lrx'), z.get('lry'))) for z in root.iter(MEI + 'zone'))
+        return list(zones[e.get('facs')] for e in root.iter() if e.get('facs'))
+
+    def test_a01_off_by_default(self):
+        mei_obj = MeiOutput(self.jsomr, stats=True, **T.kwargs)
+        mei_obj.run()
+        assert 'zones_shared' not in mei_obj.get_stats()['counters']
+
+    def test_a02_same_boxes_fewer_zones(self):
+        for page in [self.jsomr, synthetic.generate(staves=3, glyphs_per_staff=60, seed=2)]:
+            plain = MeiOutput(page, stats=True, **T.kwargs)
+            shared = MeiOutput(page, stats=True, share_zones=True, **T.kwargs)
+            plainRoot = self.parse(plain.run())
+            sharedRoot = self.parse(shared.run())
+
+            assert self.boxes(plainRoot) == self.boxes(sharedRoot)
+
+            counters = shared.get_stats()['counters']
+            assert counters['ligatures'] <= counters['zones_shared']
+            assert len(list(plainRoot.iter(MEI + 'zone'))) == counters['zones'] + counters['zones_shared']
+            assert len(list(sharedRoot.iter(MEI + 'zone'))) == counters['zones']
+
+    def test_a03_same_output_streamed_and_pooled(self):
+        page = synthetic.generate(staves=3, glyphs_per_staff=60, seed=2)
+        expected = MeiOutput(page, share_zones=True, **T.kwargs).run()
+
+        pooled = MeiOutput(page, share_zones=True, workers=2, **T.kwargs)
+        pooled.PARALLEL_MIN_GLYPHS = 0
+        assert expected == pooled.run()
+        assert expected == MeiOutput(page, share_zones=True, low_memory=True, **T.kwargs).run()
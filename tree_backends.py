@@ -0,0 +1,127 @@
+import idgen
+from mei_writer import StreamBuilder, MEI_NS
+
+# Element builders used by MeiOutput.
+#
+# A builder creates an element with all of its attributes in one call:
+#   element(parent, name, attributes) -> element (root when parent is None)
+#   comment(parent, text)
+#   get_id(element) -> xml:id
+#   to_text(root) -> serialized document
+#
+# ids come from an idgen strategy, random unless one is given.
+
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+
+class PymeiBuilder(object):
+
+    def __init__(self, ids=None):
+        import pymei
+        self.pymei = pymei
+        self.ids = ids or idgen.RandomIds()
+
+    def element(self, parent, name, attributes=None):
+        el = self.pymei.MeiElement(name)
+        el.setId(self.ids.new_id(name, attributes, self.get_id(parent) if parent is not None else None))
+        if parent is not None:
+            parent.addChild(el)
+        if attributes:
+            for a in attributes:
+                el.addAttribute(a, attributes[a])
+        return el
+
+    def comment(self, parent, text):
+        el = self.pymei.MeiElement("_comment")
+        el.setValue(text)
+        parent.addChild(el)
+
+    def get_id(self, el):
+        return el.getId()
+
+    def to_text(self, root):
+        doc = self.pymei.MeiDocument()
+        doc.root = root
+        return self.pymei.documentToText(doc)
+
+
+class EtreeBuilder(object):
+    # xml.etree keeps prefixed attribute names as given, so the output has
+    # the same layout as documentToText
+
+    def __init__(self, ids=None):
+        import xml.etree.ElementTree as etree
+        self.etree = etree
+        self.ids = ids or idgen.RandomIds()
+
+    def _new_id(self, parent, name, attributes):
+        return self.ids.new_id(name, attributes, self.get_id(parent) if parent is not None else None)
+
+    def _root_attributes(self):
+        return {'xmlns': MEI_NS}
+
+    def element(self, parent, name, attributes=None):
+        attrib = {'xml:id': self._new_id(parent, name, attributes)}
+        if parent is None:
+            attrib.update(self._root_attributes())
+        if attributes:
+            attrib.update(attributes)
+
+        if parent is None:
+            return self.etree.Element(name, attrib)
+        return self.etree.SubElement(parent, name, attrib)
+
+    def comment(self, parent, text):
+        parent.append(self.etree.Comment(text))
+
+    def get_id(self, el):
+        return el.get('xml:id')
+
+    def to_text(self, root):
+        self.etree.indent(root, space='\t')
+        text = self.etree.tostring(root, encoding='unicode')
+        return '<?xml version="1.0" encoding="UTF-8"?>\n' + text + '\n'
+
+
+class LxmlBuilder(EtreeBuilder):
+    # lxml wants namespaced names, declared on the root
+
+    NAMES = {
+        'xml:id': '{%s}id' % XML_NS,
+        'xlink:href': '{%s}href' % XLINK_NS,
+    }
+
+    def __init__(self, ids=None):
+        from lxml import etree
+        self.etree = etree
+        self.ids = ids or idgen.RandomIds()
+        self.xml_id = self.NAMES['xml:id']
+
+    def element(self, parent, name, attributes=None):
+        attrib = {self.xml_id: self._new_id(parent, name, attributes)}
+        if attributes:
+            for a in attributes:
+                attrib[self.NAMES.get(a, a)] = attributes[a]
+
+        tag = '{%s}%s' % (MEI_NS, name)
+        if parent is None:
+            return self.etree.Element(tag, attrib, nsmap={None: MEI_NS, 'xlink': XLINK_NS})
+        return self.etree.SubElement(parent, tag, attrib)
+
+    def get_id(self, el):
+        return el.get(self.xml_id)
+
+
+BACKENDS = {
+    'pymei': PymeiBuilder,
+    'etree': EtreeBuilder,
+    'lxml': LxmlBuilder,
+    'stream': StreamBuilder,
+}
+
+
+def get_builder(backend, ids=None):
+    if backend not in BACKENDS:
+        raise ValueError('unknown tree backend: %s' % backend)
+    return BACKENDS[backend](ids)
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Page-wide neume grouping on a GlyphStore.
+#
+# Same groups as grouping.group_starts, computed for every staff at once.
+# Neumes are sorted by (staff, ulx) so each staff is a contiguous segment,
+# each merge pass becomes a mask over group starts, and group ids come from
+# a cumulative sum over the final starts.
+
+
+def neume_rows(store):
+    # neume rows ordered by staff, then ulx
+    rows = np.flatnonzero(store.category == store.code('neume'))
+    return rows[np.lexsort((store.ulx[rows], store.staff[rows]))]
+
+
+def _name_flags(store, test):
+    # evaluate test once per interned string, indexed by name code
+    return np.array(list(test(s.split('.')) for s in store.strings), dtype=bool)
+
+
+def group_ids(store, max_distance, max_group_size):
+    # returns a group id per glyph, -1 for everything that isn't a neume
+    ids = np.full(len(store), -1, dtype=np.int64)
+    rows = neume_rows(store)
+    n = len(rows)
+    if not n:
+        return ids
+
+    staff = store.staff[rows]
+    names = store.name[rows]
+    left = store.ulx[rows].astype(np.int64)
+    right = left + store.ncols[rows]
+
+    segment = np.ones(n, dtype=bool)
+    segment[1:] = staff[1:] != staff[:-1]
+
+    inclinatum = _name_flags(store, lambda t: len(t) > 1 and 'inclinatum' in t[1])[names]
+    ligature = _name_flags(store, lambda t: 'ligature' in t[-1])[names]
+
+    # an inclinatum joins the neume before it
+    starts = np.flatnonzero(segment | ~inclinatum)
+
+    # a group led by a ligature joins the group after it
+    keep = segment[starts].copy()
+    keep[1:] |= ~ligature[starts[:-1]]
+    starts = starts[keep]
+
+    # merge by spacing, never the first or last group of a staff
+    ends = np.append(starts[1:], n)
+    first = segment[starts]
+    last = np.append(segment[starts[1:]], True)
+    gap = np.zeros(len(starts), dtype=np.int64)
+    gap[1:] = left[starts[1:]] - right[ends[:-1] - 1]
+
+    merge = ~first & ~last & (gap < max_distance) & (ends - starts < max_group_size)
+    starts = starts[~merge]
+
+    isStart = np.zeros(n, dtype=np.int64)
+    isStart[starts] = 1
+    ids[rows] = np.cumsum(isStart) - 1
+
+    return ids
+
+
+def group_starts(ids):
+    # group starts within a slice of group ids, as grouping.group_starts
+    ids = np.asarray(ids)
+    if not len(ids):
+        return []
+    return [0] + (np.flatnonzero(ids[1:] != ids[:-1]) + 1).tolist()
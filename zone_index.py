@@ -0,0 +1,159 @@
+import json
+import math
+from mei_writer import START
+
+# Spatial index over the zones of a converted page.
+#
+# Zones are bucketed in a uniform grid of cell_size pixels, and every zone
+# keeps the (xml:id, name) of the elements pointing at it with facs, so a
+# region of the image maps straight back to nc, clef, custos, division and
+# staff elements. The index can be saved as a JSON sidecar next to the MEI
+# and loaded without it.
+
+DEFAULT_CELL_SIZE = 128
+SIDECAR_VERSION = 1
+
+
+class ZoneIndex(object):
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.boxes = {}         # zone id -> (ulx, uly, lrx, lry)
+        self.elements = {}      # zone id -> [(element id, name)]
+        self.cells = {}         # (column, row) -> [zone id]
+        self._rank = {}         # zone id -> order it was added in
+        self._bounds = None     # occupied cells, (left, top, right, bottom)
+
+    def add_zone(self, zone_id, ulx, uly, lrx, lry):
+        box = (ulx, uly, lrx, lry)
+        self.boxes[zone_id] = box
+        self._rank[zone_id] = len(self._rank)
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(zone_id)
+
+        (left, top) = self._cell(ulx, uly)
+        (right, bottom) = self._cell(lrx, lry)
+        if self._bounds is not None:
+            (left, top) = (min(left, self._bounds[0]), min(top, self._bounds[1]))
+            (right, bottom) = (max(right, self._bounds[2]), max(bottom, self._bounds[3]))
+        self._bounds = (left, top, right, bottom)
+
+    def link(self, zone_id, element_id, name):
+        self.elements.setdefault(zone_id, []).append((element_id, name))
+
+    def add_fragment(self, events, zones):
+        # a staff made elsewhere: stream events and (id, ulx, uly, lrx, lry)
+        # zone tuples, see MeiOutput._generate_staves_parallel
+        for (zoneId, ulx, uly, lrx, lry) in zones:
+            self.add_zone(zoneId, int(ulx), int(uly), int(lrx), int(lry))
+        for event in events:
+            if event[0] == START:
+                attributes = dict(event[2])
+                if 'facs' in attributes:
+                    self.link(attributes['facs'], attributes['xml:id'], event[1])
+
+    def elements_in_rect(self, ulx, uly, lrx, lry, names=None):
+        # (element id, name) of elements whose zone overlaps the rectangle,
+        # in document order of their zones
+        found = set()
+        for cell in self._cells((ulx, uly, lrx, lry)):
+            for zoneId in self.cells.get(cell, ()):
+                (zulx, zuly, zlrx, zlry) = self.boxes[zoneId]
+                if zulx <= lrx and ulx <= zlrx and zuly <= lry and uly <= zlry:
+                    found.add(zoneId)
+
+        return list(self._elements(sorted(found, key=self._rank.get), names))
+
+    def nearest_element(self, x, y, names=None):
+        # (element id, name) whose zone is closest to the point, inside a
+        # zone counting as distance 0; None for an empty index
+        if not self.boxes:
+            return None
+
+        # rings closer than the occupied cells are empty, so start at them
+        (column, row) = self._cell(x, y)
+        (left, top, right, bottom) = self._bounds
+        best = None
+        ring = max(0, left - column, column - right, top - row, row - bottom)
+        while True:
+            for cell in self._ring(column, row, ring):
+                for zoneId in self.cells.get(cell, ()):
+                    for element in self._elements([zoneId], names):
+                        distance = self._distance(self.boxes[zoneId], x, y)
+                        if best is None or distance < best[0]:
+                            best = (distance, element)
+
+            # every zone not seen yet is at least ring cells away
+            if best is not None and best[0] <= ring * self.cell_size:
+                return best[1]
+            if not self._ring_in_bounds(column, row, ring):
+                return best[1] if best is not None else None
+            ring += 1
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, separators=(',', ':'))
+
+    def to_dict(self):
+        return {
+            'version': SIDECAR_VERSION,
+            'cell_size': self.cell_size,
+            'zones': list([z] + list(self.boxes[z]) for z in self._rank),
+            'elements': list([e, n, z] for z in self._rank for (e, n) in self.elements.get(z, ())),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != SIDECAR_VERSION:
+            raise ValueError('unknown zone index version: %s' % data.get('version'))
+
+        index = cls(data['cell_size'])
+        for (zoneId, ulx, uly, lrx, lry) in data['zones']:
+            index.add_zone(zoneId, ulx, uly, lrx, lry)
+        for (elementId, name, zoneId) in data['elements']:
+            index.link(zoneId, elementId, name)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        import jsomr_io
+        return cls.from_dict(jsomr_io.load(path))
+
+    def _elements(self, zoneIds, names):
+        for zoneId in zoneIds:
+            for (elementId, name) in self.elements.get(zoneId, ()):
+                if names is None or name in names:
+                    yield (elementId, name)
+
+    def _cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def _cells(self, box):
+        (left, top) = self._cell(box[0], box[1])
+        (right, bottom) = self._cell(box[2], box[3])
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield (column, row)
+
+    def _ring(self, column, row, ring):
+        # cells ring cells away from (column, row), clipped to the occupied
+        # ones so a query far outside the page doesn't walk empty cells
+        (left, top, right, bottom) = self._bounds
+        for r in (row - ring, row + ring) if ring else (row,):
+            if top <= r <= bottom:
+                for c in range(max(column - ring, left), min(column + ring, right) + 1):
+                    yield (c, r)
+        for c in (column - ring, column + ring) if ring else ():
+            if left <= c <= right:
+                for r in range(max(row - ring + 1, top), min(row + ring - 1, bottom) + 1):
+                    yield (c, r)
+
+    def _ring_in_bounds(self, column, row, ring):
+        # whether occupied cells are left outside the ring
+        (left, top, right, bottom) = self._bounds
+        return column - ring > left or row - ring > top or column + ring < right or row + ring < bottom
+
+    def _distance(self, box, x, y):
+        dx = max(box[0] - x, 0, x - box[2])
+        dy = max(box[1] - y, 0, y - box[3])
+        return math.hypot(dx, dy)